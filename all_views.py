@@ -5,6 +5,10 @@ import sublime_plugin
 import sublime
 import re
 import time
+from collections import OrderedDict
+
+from .common.ranking import rank_completions
+from .common.metrics import metrics
 
 # limits to prevent bogging down the system
 MIN_WORD_SIZE = 4
@@ -13,6 +17,14 @@ MAX_WORD_SIZE = 80
 MAX_VIEWS = 40
 MAX_WORDS_PER_VIEW = 10000
 MAX_FIX_TIME_SECS_PER_VIEW = 0.04
+# Bigger views are not tokenized, fix_truncation searches them word by word
+MAX_TOKENIZE_SIZE = 4000000
+# The view being edited has a new change_count() after every keystroke and is
+# tokenized again each time, only while that takes a few milliseconds
+MAX_EDITED_TOKENIZE_SIZE = 50000
+
+WORD_TOKEN = re.compile(r'\w+')
+WHOLE_WORD_TOKEN = re.compile(r'\w+\Z')
 
 kt_active_view_list = []
 
@@ -25,41 +37,101 @@ class ActiveViewsTracker(sublime_plugin.EventListener):
         if len(kt_active_view_list) > MAX_VIEWS:
             kt_active_view_list.pop()
 
+# Words found in each view, see get_view_words
+view_word_caches = {}
+MAX_CACHED_PREFIXES = 16
+
+class ViewWords:
+    # Words of a view, valid as long as its change_count() doesn't change
+    def __init__(self, change_count):
+        self.change_count = change_count
+        # fix_truncation result of every word checked so far
+        self.fixed_words = {}
+        # filtered and fixed words for the latest (prefix, location) requests
+        self.results = OrderedDict()
+        # every word of the view, and the words by their prefix one character shorter
+        self.tokens = None
+        self.extensions = None
+
+    def word_tokens(self, view, max_size=MAX_TOKENIZE_SIZE):
+        # Set of the words in view, None if it's bigger than max_size
+        if self.tokens is None and view.size() <= max_size:
+            with metrics.timer('all_views.tokenize'):
+                self.tokens = set(WORD_TOKEN.findall(view.substr(sublime.Region(0, view.size()))))
+        return self.tokens
+
+    def one_char_extensions(self, word):
+        # Words of the view made of word and one more character
+        if self.extensions is None:
+            self.extensions = {}
+            for token in self.tokens:
+                self.extensions.setdefault(token[:-1], []).append(token)
+        return sorted(self.extensions.get(word, []))
+
+def get_view_words(view, prefix, location):
+    view_id = view.id()
+    change_count = view.change_count()
+    cache = view_word_caches.get(view_id)
+    if cache is None or cache.change_count != change_count:
+        cache = ViewWords(change_count)
+        view_word_caches[view_id] = cache
+
+    key = (prefix, location)
+    if key in cache.results:
+        return cache.results[key]
+    with metrics.timer('all_views.extract_completions'):
+        if location is not None:
+            view_words = view.extract_completions(prefix, location)
+        else:
+            view_words = view.extract_completions(prefix)
+    view_words = filter_words(view_words)
+    max_tokenize_size = MAX_EDITED_TOKENIZE_SIZE if location is not None else MAX_TOKENIZE_SIZE
+    with metrics.timer('all_views.fix_truncation'):
+        fixed_view_words = fix_truncation(view, view_words, cache, max_tokenize_size)
+    metrics.set_items('all_views', view_id, len(fixed_view_words))
+    # Unless fix_truncation ran out of time
+    if all(w in cache.fixed_words for w in view_words):
+        cache.results[key] = fixed_view_words
+        if len(cache.results) > MAX_CACHED_PREFIXES:
+            cache.results.popitem(last=False)
+    return fixed_view_words
+
 def all_views_autocompletion(view, prefix, locations):
     global kt_active_view_list
     words = []
 
     # Limit number of views but always include the active view. This
     # view goes first to prioritize matches close to cursor position.
-    other_views = [v for v in sublime.active_window().views() if v.id() != view.id()]
-    other_views_in_order = []
-    added_view = set()
-    # TODO: optimize it
-    for ordered_index in kt_active_view_list:
-        for cur_view in other_views:
-            if cur_view.id() == ordered_index and cur_view.id() not in added_view:
-                other_views_in_order.append(cur_view)
-                added_view.add(cur_view.id())
-    for cur_view in other_views:
-        if cur_view.id() not in added_view:
-            other_views_in_order.append(cur_view)
-            added_view.add(cur_view.id())
+    window_views = sublime.active_window().views()
+    other_views = [v for v in window_views if v.id() != view.id()]
+    # Most recently activated views first, then the others in window order
+    rank = dict((view_id, index) for index, view_id in enumerate(kt_active_view_list))
+    other_views_in_order = sorted(other_views, key=lambda v: rank.get(v.id(), len(rank)))
 
     views = [view] + other_views_in_order
     views = views[0:MAX_VIEWS]
 
+    same_view_words = None
     for v in views:
-        if len(locations) > 0 and v.id == view.id:
-            view_words = v.extract_completions(prefix, locations[0])
-        else:
-            view_words = v.extract_completions(prefix)
-        view_words = filter_words(view_words)
-        view_words = fix_truncation(v, view_words)
+        location = None
+        if len(locations) > 0 and v.id() == view.id():
+            location = locations[0]
+        view_words = get_view_words(v, prefix, location)
+        if v.id() == view.id():
+            same_view_words = set(view_words)
         words += view_words
 
+    # Forget the views that were closed
+    open_view_ids = set(v.id() for v in window_views)
+    for view_id in list(view_word_caches.keys()):
+        if view_id not in open_view_ids:
+            del view_word_caches[view_id]
+            metrics.forget_view(view_id)
+
     words = without_duplicates(words)
     matches = [(w + "\t.", w.replace('$', '\\$')) for w in words]
-    return matches
+    with metrics.timer('all_views.rank'):
+        return rank_completions(matches, prefix, same_view_words=same_view_words)
 
 def filter_words(words):
     words = words[0:MAX_WORDS_PER_VIEW]
@@ -79,12 +151,29 @@ def without_duplicates(words):
 
 # Ugly workaround for truncation bug in Sublime when using view.extract_completions()
 # in some types of files.
-def fix_truncation(view, words):
-    fixed_words = []
+def fix_truncation(view, words, view_words=None, max_tokenize_size=MAX_TOKENIZE_SIZE):
+    # view_words is the ViewWords of the view, its caches are used and filled
+    if view_words is None:
+        view_words = ViewWords(view.change_count())
+    fixed_words = view_words.fixed_words
+    tokens = view_words.word_tokens(view, max_tokenize_size)
+    results = []
     start_time = time.time()
 
     for i, w in enumerate(words):
+        if w in fixed_words:
+            results += fixed_words[w]
+            continue
+
         #The word is truncated if and only if it cannot be found with a word boundary before and after
+        if tokens is not None and WHOLE_WORD_TOKEN.match(w):
+            # Same check as the regexes below, against the words of the view
+            if w in tokens:
+                fixed_words[w] = [w]
+            else:
+                fixed_words[w] = view_words.one_char_extensions(w) or [w]
+            results += fixed_words[w]
+            continue
 
         # this fails to match strings with trailing non-alpha chars, like
         # 'foo?' or 'bar!', which are common for instance in Ruby.
@@ -95,21 +184,22 @@ def fix_truncation(view, words):
             extended_words = []
             view.find_all(r'\b' + re.escape(w) + r'\w\b', 0, "$0", extended_words)
             if len(extended_words) > 0:
-                fixed_words += extended_words
+                fixed_words[w] = extended_words
             else:
                 # to compensate for the missing match problem mentioned above, just
                 # use the old word if we didn't find any extended matches
-                fixed_words.append(w)
+                fixed_words[w] = [w]
         else:
             #Pass through non-truncated words
-            fixed_words.append(w)
+            fixed_words[w] = [w]
+        results += fixed_words[w]
 
         # if too much time is spent in here, bail out,
         # and don't bother fixing the remaining words
         if time.time() - start_time > MAX_FIX_TIME_SECS_PER_VIEW:
-            return fixed_words + words[i+1:]
+            return results + words[i+1:]
 
-    return fixed_words
+    return results
 
 if sublime.version() >= '3000':
   def is_empty_match(match):
@@ -7,6 +7,23 @@ from .swift import swift_autocompletion_call
 from .swift import swift_autocompletion_enum
 from .swift import swift_autocompletion_case_enum
 from .reactjs import reactjs_autocompletion
+from .common.workers import worker_pool
+from .common.ranking import recent_completions
+from .common.metrics import metrics
+from .common.change_tracker import change_trackers
+from .common.memory_budget import memory_budget
+from .common.utils import SETTINGS_FILE
+
+def update_metrics_setting():
+    metrics.enabled = bool(sublime.load_settings(SETTINGS_FILE).get('collect_metrics', False))
+
+def plugin_loaded():
+    update_metrics_setting()
+    sublime.load_settings(SETTINGS_FILE).add_on_change('kt_autocomplete_metrics', update_metrics_setting)
+
+def plugin_unloaded():
+    sublime.load_settings(SETTINGS_FILE).clear_on_change('kt_autocomplete_metrics')
+    worker_pool.shutdown()
 
 class KtAutoComplete(sublime_plugin.EventListener):
     def on_query_completions(self, view, prefix, locations):
@@ -20,6 +37,37 @@ class KtAutoComplete(sublime_plugin.EventListener):
         #     return (swift_autocompletion(view, prefix, locations), sublime.INHIBIT_WORD_COMPLETIONS)
         # if view.substr(locations[0] - 1) == "." and prefix == "":
         #     return (swift_autocompletion_call(view, prefix, locations), sublime.INHIBIT_WORD_COMPLETIONS)
-        result = (all_views_autocompletion(view, prefix, locations) +
-            reactjs_autocompletion(view, prefix, locations), sublime.INHIBIT_WORD_COMPLETIONS)
+        with metrics.timer('query'):
+            with metrics.timer('query.all_views'):
+                all_views_completions = all_views_autocompletion(view, prefix, locations)
+            with metrics.timer('query.reactjs'):
+                reactjs_completions = reactjs_autocompletion(view, prefix, locations)
+        result = (all_views_completions + reactjs_completions, sublime.INHIBIT_WORD_COMPLETIONS)
         return result
+
+    def on_post_text_command(self, view, command_name, args):
+        # Remember what was picked so it ranks higher next time
+        if command_name in ("commit_completion", "insert_best_completion"):
+            for sel in view.sel():
+                word = view.substr(view.word(sel.begin()))
+                if word.strip() != "":
+                    recent_completions.record(word)
+                break
+
+class KtAutocompleteMetricsCommand(sublime_plugin.TextCommand):
+    # Shows the latency percentiles and item counts in an output panel
+    def run(self, edit, reset=False):
+        text = metrics.report()
+        text = text + "\n%-36s %8s %10s\n" % ("change tracker", "hits", "misses")
+        for tracker in change_trackers:
+            stats = tracker.stats()
+            text = text + "%-36s %8d %10d\n" % (tracker.name, stats['hits'], stats['misses'])
+        stats = memory_budget.stats()
+        text = text + "\nParsed views: %d, estimated %.1f MB\n" % (stats['views'], stats['estimated_bytes'] / 1000000.0)
+        if reset:
+            metrics.reset()
+
+        window = self.view.window()
+        panel = window.create_output_panel('kt_autocomplete_metrics')
+        panel.run_command('append', { 'characters': text })
+        window.run_command('show_panel', { 'panel': 'output.kt_autocomplete_metrics' })
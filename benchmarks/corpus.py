@@ -0,0 +1,122 @@
+# Generated source files for the benchmarks. The same seed and size always
+# give the same text, so results of different commits can be compared.
+
+import random
+
+WORDS = ["alpha", "beta", "gamma", "delta", "value", "count", "name", "title",
+    "index", "item", "model", "view", "data", "frame", "color", "delegate"]
+TYPES = ["Int", "String", "Double", "Bool", "[Int]", "[String: Int]", "CGFloat"]
+OBJC_TYPES = ["NSString *", "NSInteger", "CGFloat", "BOOL", "id", "NSArray *",
+    "UIView *", "NSDictionary *"]
+
+def build(target_chars, seed, write_unit):
+    r = random.Random(seed)
+    lines = []
+    length = 0
+    unit = 0
+    while length < target_chars:
+        for line in write_unit(r, unit):
+            lines.append(line)
+            length = length + len(line) + 1
+        unit = unit + 1
+    return "\n".join(lines)
+
+def word(r):
+    return r.choice(WORDS) + str(r.randint(0, 50))
+
+def swift_unit(r, n):
+    name = "Type%d" % n
+    kind = r.choice(["class", "struct", "enum", "protocol", "extension", "func"])
+    lines = ["// MARK: %s %s" % (kind, name)]
+    if kind == "class":
+        lines.append("class %s: NSObject, Proto%d {" % (name, n % 7))
+        lines.append("    let %s: Int = 3" % word(r))
+        lines.append("    var %s = Foo%d()" % (word(r), n))
+        lines.append("    init(%s: Int, %s: String) {" % (word(r), word(r)))
+        lines.append("        super.init()")
+        lines.append("    }")
+        for i in range(r.randint(1, 5)):
+            lines.append("    func %s(_ %s: Int, with %s: %s) -> Int {" % (word(r), word(r), word(r), r.choice(TYPES)))
+            lines.append("        // %s" % word(r))
+            lines.append("        let x = %s(a: 1)" % name)
+            lines.append("        if x > 0 { print(\"{%s}\") }" % word(r))
+            lines.append("")
+            lines.append("        var y: Bar%d = Bar%d()" % (n, n))
+            lines.append("        return 0")
+            lines.append("    }")
+        lines.append("}")
+    elif kind == "struct":
+        lines.append("struct %s {" % name)
+        for i in range(r.randint(0, 4)):
+            lines.append("    %s %s: %s" % (r.choice(["let", "var"]), word(r), r.choice(TYPES)))
+        lines.append("    func describe() -> String { return \"\" }")
+        lines.append("}")
+    elif kind == "enum":
+        lines.append("enum %s {" % name)
+        for i in range(r.randint(1, 6)):
+            lines.append("    case %s" % word(r))
+        lines.append("}")
+    elif kind == "protocol":
+        lines.append("protocol %s {" % name)
+        lines.append("    func %s(%s: Int)" % (word(r), word(r)))
+        lines.append("    var %s: Int { get }" % word(r))
+        lines.append("}")
+    elif kind == "extension":
+        lines.append("extension Type%d {" % r.randint(0, n))
+        lines.append("    func %s(%s: Int) {}" % (word(r), word(r)))
+        lines.append("}")
+    else:
+        lines.append("func %s(%s: Int = 0, %s %s: String) {" % (word(r), word(r), word(r), word(r)))
+        lines.append("    let z = 1")
+        lines.append("}")
+    lines.append("")
+    return lines
+
+def objc_param(r, label):
+    return "%s:(%s)%s" % (label, r.choice(OBJC_TYPES), word(r))
+
+def objc_unit(r, n):
+    lines = ["// Class%d.h" % n, "@interface Class%d : NSObject" % n, ""]
+    for i in range(r.randint(1, 3)):
+        params = [objc_param(r, "initWith" + word(r).capitalize())]
+        params.extend(objc_param(r, word(r)) for j in range(r.randint(0, 3)))
+        lines.append("- (instancetype)%s;" % " ".join(params))
+    for i in range(r.randint(2, 10)):
+        params = [objc_param(r, word(r)) for j in range(r.randint(1, 4))]
+        lines.append("- (%s)%s;" % (r.choice(OBJC_TYPES), " ".join(params)))
+    lines.append("@property (nonatomic) %s%s;" % (r.choice(OBJC_TYPES), word(r)))
+    lines.append("@end")
+    lines.append("")
+    return lines
+
+def react_unit(r, n):
+    name = "Component%d" % n
+    lines = ["var %s = React.createClass({" % name]
+    for i in range(r.randint(1, 4)):
+        method = word(r)
+        lines.append("  %s: function() {" % method)
+        lines.append("    // %s" % word(r))
+        lines.append("    var %s = this.props.%s;" % (word(r), word(r)))
+        lines.append("    %s.%s(%s.%s);" % (r.choice(["Store", "Actions", "Utils"]), word(r), name, method))
+        lines.append("  },")
+    lines.append("  render: function() {")
+    lines.append("    return <div className=\"%s\">{this.state.%s}</div>;" % (word(r), word(r)))
+    lines.append("  }")
+    lines.append("});")
+    lines.append("")
+    return lines
+
+def swift_corpus(target_chars, seed=1):
+    return build(target_chars, seed, swift_unit)
+
+def objc_corpus(target_chars, seed=1):
+    return build(target_chars, seed, objc_unit)
+
+def react_corpus(target_chars, seed=1):
+    return build(target_chars, seed, react_unit)
+
+CORPORA = {
+    'swift': swift_corpus,
+    'objc': objc_corpus,
+    'react': react_corpus,
+}
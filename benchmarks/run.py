@@ -0,0 +1,154 @@
+# Times the parsing engine outside of Sublime on generated corpora.
+#
+#   python benchmarks/run.py --output before.json
+#   python benchmarks/run.py --compare before.json
+#
+# Results are written as JSON. With --compare the best times are compared to
+# a previous run, and the exit status is 1 if any got slower than --threshold.
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import types
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS_DIR)
+# The plugin uses relative imports, it's loaded as a package of this name
+PACKAGE = 'autocomplete'
+
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, 'stubs'))
+
+from corpus import CORPORA
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_REPEAT = 5
+
+def load_package():
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [ROOT]
+    sys.modules[PACKAGE] = package
+
+def module(name):
+    return importlib.import_module(PACKAGE + '.' + name)
+
+def benchmarks():
+    # (name, corpus, whether comments are stripped first, function)
+    text_processing = module('text_processing')
+    swift_parser = module('swift_parser')
+    utils = module('common.utils')
+    objc = module('objc')
+    reactjs_parser = module('reactjs_parser')
+    return [
+        ('comment_and_empty_line_remove', 'swift', False, utils.comment_and_empty_line_remove),
+        ('strip_function_bodies', 'swift', True, swift_parser.strip_function_bodies),
+        ('scan_text', 'react', True, lambda str: text_processing.scan_text(str, reactjs_parser.DOTNAME_RULES)),
+        ('construct_declarations_swift', 'swift', True, swift_parser.construct_declarations_swift),
+        ('construct_func_objc', 'objc', False, objc.construct_func_objc),
+        ('construct_reactjs_suggestions', 'react', True, reactjs_parser.construct_reactjs_suggestions),
+    ]
+
+def time_function(function, argument, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return (times[0], times[len(times) // 2])
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except Exception:
+        return None
+
+def run(sizes, repeat, name_filter):
+    strip = module('common.utils').comment_and_empty_line_remove
+    corpora = {}
+    results = []
+    for (name, corpus, stripped, function) in benchmarks():
+        if name_filter is not None and name_filter not in name:
+            continue
+        for size in sizes:
+            key = (corpus, size, stripped)
+            if key not in corpora:
+                text = CORPORA[corpus](size)
+                corpora[key] = strip(text) if stripped else text
+            text = corpora[key]
+            (best, median) = time_function(function, text, repeat)
+            results.append({
+                'benchmark': name,
+                'corpus': corpus,
+                'size': size,
+                'chars': len(text),
+                'best': best,
+                'median': median,
+                'repeat': repeat,
+            })
+            print("%-32s %-6s %9d chars  best %9.2f ms  median %9.2f ms" %
+                (name, corpus, len(text), best * 1000, median * 1000), file=sys.stderr)
+    return results
+
+def compare(results, baseline, threshold):
+    # Prints the ratio of the best times to the ones of baseline, returns
+    # whether any benchmark got slower than threshold
+    previous = {}
+    for result in baseline['results']:
+        previous[(result['benchmark'], result['size'])] = result['best']
+    regressed = False
+    print("", file=sys.stderr)
+    for result in results:
+        old = previous.get((result['benchmark'], result['size']))
+        if old is None or old == 0:
+            continue
+        ratio = result['best'] / old
+        mark = ""
+        if ratio > threshold:
+            mark = "  SLOWER"
+            regressed = True
+        print("%-32s %9d  %9.2f ms -> %9.2f ms  x%.2f%s" %
+            (result['benchmark'], result['size'], old * 1000, result['best'] * 1000, ratio, mark), file=sys.stderr)
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the autocomplete parsing engine")
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma separated corpus sizes in characters")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--filter', default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument('--output', default=None, help="write the JSON results to this file instead of stdout")
+    parser.add_argument('--compare', default=None, help="JSON results of a previous run")
+    parser.add_argument('--threshold', type=float, default=1.1,
+        help="slowdown ratio reported as a regression by --compare")
+    args = parser.parse_args()
+
+    load_package()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': run(sizes, args.repeat, args.filter),
+    }
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report['results'], baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
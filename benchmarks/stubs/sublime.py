@@ -0,0 +1,52 @@
+# Just enough of the sublime module to import the plugin outside the editor.
+
+INHIBIT_WORD_COMPLETIONS = 8
+INHIBIT_EXPLICIT_COMPLETIONS = 16
+
+class Region:
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def empty(self):
+        return self.a == self.b
+
+class Settings(dict):
+    def get(self, key, default=None):
+        return dict.get(self, key, default)
+
+    def set(self, key, value):
+        self[key] = value
+
+settings = {}
+
+def load_settings(name):
+    return settings.setdefault(name, Settings())
+
+def version():
+    return '3211'
+
+def set_timeout(callback, delay=0):
+    callback()
+
+def set_timeout_async(callback, delay=0):
+    callback()
+
+def status_message(message):
+    pass
+
+def cache_path():
+    import tempfile
+    return tempfile.gettempdir()
+
+def windows():
+    return []
+
+def active_window():
+    return None
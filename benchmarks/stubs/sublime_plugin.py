@@ -0,0 +1,15 @@
+# Just enough of the sublime_plugin module to import the plugin outside the editor.
+
+class EventListener:
+    pass
+
+class TextCommand:
+    def __init__(self, view):
+        self.view = view
+
+class WindowCommand:
+    def __init__(self, window):
+        self.window = window
+
+class ApplicationCommand:
+    pass
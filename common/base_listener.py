@@ -1,43 +1,100 @@
 import sublime, sublime_plugin
 
 from .utils import *
+from .incremental import IncrementalParser
+from .workers import ParseScheduler, worker_pool
+from .change_tracker import ChangeTracker
+from .memory_budget import memory_budget
+from .metrics import metrics
 
-import time
+def no_suggestions(str):
+    return []
 
 class BaseViewDeactivatedListener(sublime_plugin.EventListener):
+    # to override with a module level function returning the list of
+    # suggestions found in a string, it can be sent to parse worker processes
+    get_suggestions = staticmethod(no_suggestions)
+    # can be overridden with a split function of IncrementalParser, the
+    # default splits at top-level blocks
+    split_blocks = None
+
+    def __init__(self):
+        super().__init__()
+        self.incremental_parser = IncrementalParser(self.get_suggestions, self.split_blocks)
+        self.scheduler = ParseScheduler()
+        self.change_tracker = ChangeTracker(type(self).__name__)
+
     def on_deactivated(self, view):
-        str = view.substr(sublime.Region(0, view.size()))
         view_id = view.id()
+        str = self.change_tracker.changed_content(view)
+        if str is None:
+            memory_budget.touch(self, view_id)
+            return
+        max_parse_size = get_setting('max_parse_size', DEFAULT_MAX_PARSE_SIZE)
+        text_length = len(str)
 
-        sublime.set_timeout_async(lambda: self.parse_str_async(str,
-            lambda suggestions: self.parse_completion(view_id, suggestions)), 0)
+        self.scheduler.schedule(view_id, lambda: self.parse_str_async(view_id, str, max_parse_size,
+            lambda suggestions: self.parse_completion(view_id, suggestions, text_length)))
 
-    def parse_str_async(self, str, completion):
-        t = time.time()
-        str = comment_and_empty_line_remove(str)
-        suggestions = []
-        if len(str) >= 200000:
-            # TODO:
-            pass
-        else:
-            suggestions = self.get_suggestions(str)
-        # print("Total parse time = ", time.time() - t)
+    def on_close(self, view):
+        view_id = view.id()
+        self.scheduler.cancel(view_id)
+        memory_budget.remove(self, view_id)
+        self.forget_view(view_id)
+
+    def parse_str_async(self, view_id, str, max_parse_size, completion):
+        suggestions = self.parse_str(view_id, str, max_parse_size)
         sublime.set_timeout(lambda: completion(suggestions), 0)
 
-    def parse_completion(self, view_id, suggestions):
-        stored_suggestions = []
-        suggestions_set = set()
-        for suggestion in suggestions:
-            if not suggestion in suggestions_set:
-                suggestions_set.add(suggestion)
-                stored_suggestions.append(suggestion)
+    def parse_str(self, view_id, str, max_parse_size):
+        # Runs on the async thread, the result goes to store_suggestions
+        with metrics.timer('comment_strip'):
+            str = comment_and_empty_line_remove(str)
+        suggestions = []
+        if len(str) < max_parse_size:
+            with metrics.timer('parse.' + type(self).__name__):
+                blocks = self.incremental_parser.parse(view_id, str, worker_pool.map)
+                suggestions = dedup_strings(suggestion for block in blocks for suggestion in block)
+        return suggestions
+
+    def parse_completion(self, view_id, suggestions, text_length):
+        if not sublime.View(view_id).is_valid():
+            # Closed while it was parsed, the parse filled the incremental
+            # parser cache again
+            self.forget_view(view_id)
+            return
+        with metrics.timer('store.' + type(self).__name__):
+            count = self.store_suggestions(view_id, suggestions)
+        metrics.set_items(type(self).__name__, view_id, count)
+        memory_budget.touch(self, view_id, text_length)
+
+    def store_suggestions(self, view_id, suggestions):
+        # Returns the number of items stored
         storage = self.suggestion_storage()
-        storage[view_id] = stored_suggestions
+        storage[view_id] = suggestions
+        index = self.suggestion_index()
+        if index is not None:
+            index.update(view_id, suggestions)
+        return len(suggestions)
 
-    def get_suggestions(self, str):
-        # to override
-        return []
+    def forget_view(self, view_id):
+        # Drops everything kept for the view, it's parsed from scratch if it
+        # shows up again
+        self.incremental_parser.forget(view_id)
+        self.change_tracker.forget(view_id)
+        metrics.forget_view(view_id)
+        self.forget_suggestions(view_id)
+
+    def forget_suggestions(self, view_id):
+        self.suggestion_storage().pop(view_id, None)
+        index = self.suggestion_index()
+        if index is not None:
+            index.remove(view_id)
 
     def suggestion_storage(self):
         # to override
         return {}
+
+    def suggestion_index(self):
+        # to override, a PrefixIndex kept in sync with suggestion_storage
+        return None
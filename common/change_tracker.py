@@ -0,0 +1,54 @@
+import sublime
+
+from .metrics import metrics
+
+import threading
+
+change_trackers = []
+
+class ChangeTracker:
+    # Remembers view.change_count() and a hash of the content of the last
+    # parse of each view, so switching tabs without editing doesn't trigger
+    # a parse. Hits and misses are counted.
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.change_counts = {}
+        self.hashes = {}
+        self.hits = 0
+        self.misses = 0
+        change_trackers.append(self)
+
+    def changed_content(self, view):
+        # Returns the content of view if it changed since the last call, None
+        # otherwise. The buffer isn't even copied if change_count() says
+        # nothing happened.
+        view_id = view.id()
+        change_count = view.change_count()
+        with self.lock:
+            if self.change_counts.get(view_id) == change_count:
+                self.hits = self.hits + 1
+                return None
+            self.change_counts[view_id] = change_count
+        with metrics.timer('buffer_copy'):
+            str = view.substr(sublime.Region(0, view.size()))
+        with metrics.timer('buffer_hash'):
+            content_hash = hash(str)
+        with self.lock:
+            # e.g. an edit that was undone
+            if self.hashes.get(view_id) == content_hash:
+                self.hits = self.hits + 1
+                return None
+            self.hashes[view_id] = content_hash
+            self.misses = self.misses + 1
+        return str
+
+    def forget(self, view_id):
+        # The next changed_content call for this view returns its content
+        with self.lock:
+            self.change_counts.pop(view_id, None)
+            self.hashes.pop(view_id, None)
+
+    def stats(self):
+        with self.lock:
+            return { 'hits': self.hits, 'misses': self.misses }
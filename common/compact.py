@@ -0,0 +1,181 @@
+from array import array
+from bisect import bisect_left
+import sys
+import threading
+
+# Suggestion tables of preloaded SDKs repeat the same type and parameter
+# names thousands of times. The tables below store ids into one shared string
+# table in arrays instead of lists of tuples of str. They pickle as the plain
+# lists and dicts they replace. Strings are reference counted by the tables
+# using them and leave the table with the last one, so it doesn't keep the
+# vocabulary of every view parsed since Sublime started.
+
+class StringTable:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.strings = []
+        self.ids = {}
+        # counts[id] is the number of uses of strings[id] in live tables
+        self.counts = []
+        # ids of the released strings, reused first
+        self.free = []
+        # arrays of ids waiting to be released
+        self.released = []
+
+    def acquire(self, strings):
+        # Ids of strings, each use counts as a reference until release
+        results = array('I')
+        with self.lock:
+            for string in strings:
+                string_id = self.ids.get(string)
+                if string_id is None:
+                    if len(self.free) > 0:
+                        string_id = self.free.pop()
+                        self.strings[string_id] = string
+                        self.counts[string_id] = 0
+                    else:
+                        string_id = len(self.strings)
+                        self.strings.append(string)
+                        self.counts.append(0)
+                    self.ids[string] = string_id
+                self.counts[string_id] = self.counts[string_id] + 1
+                results.append(string_id)
+            self.drain()
+        return results
+
+    def release(self, string_ids):
+        # Called from __del__, which the garbage collector may run in the
+        # middle of acquire. The ids are queued and handled by whoever holds
+        # the lock.
+        self.released.append(string_ids)
+        if self.lock.acquire(False):
+            try:
+                self.drain()
+            finally:
+                self.lock.release()
+
+    def drain(self):
+        # Only with the lock held
+        while len(self.released) > 0:
+            for string_id in self.released.pop():
+                count = self.counts[string_id] - 1
+                self.counts[string_id] = count
+                if count == 0:
+                    del self.ids[self.strings[string_id]]
+                    self.strings[string_id] = None
+                    self.free.append(string_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+string_table = StringTable()
+
+class PairList:
+    # Read only list of (str, str) tuples. The second strings are snippets
+    # like "x: ${1:x}, y: ${2:y}". Each snippet is one id, the parser memoizes
+    # them, so an overload set or a struct used in many files shares one
+    # string.
+    #
+    # Everything is in one array, most tables are small and every array has
+    # its own overhead: the length n, the ids of the n first strings, then the
+    # ids of the n second strings.
+    __slots__ = ('data',)
+
+    def __init__(self, pairs=()):
+        pairs = list(pairs)
+        self.data = array('I', [len(pairs)])
+        self.data.extend(string_table.acquire([first for (first, second) in pairs]))
+        self.data.extend(string_table.acquire([second for (first, second) in pairs]))
+
+    def __del__(self):
+        # data isn't set if __init__ failed
+        data = getattr(self, 'data', None)
+        if data is not None:
+            string_table.release(data[1:])
+
+    def second(self, index):
+        return string_table.strings[self.data[1 + self.data[0] + index]]
+
+    def __len__(self):
+        return self.data[0]
+
+    def __iter__(self):
+        strings = string_table.strings
+        for index in range(self.data[0]):
+            yield (strings[self.data[1 + index]], self.second(index))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        count = self.data[0]
+        if index < 0:
+            index = index + count
+        if index < 0 or index >= count:
+            raise IndexError(index)
+        return (string_table.strings[self.data[1 + index]], self.second(index))
+
+    def __reduce__(self):
+        return (PairList, (list(self),))
+
+class GroupTable:
+    # Read only {str: [str]} dict
+    __slots__ = ('names', 'offsets', 'members')
+
+    def __init__(self, groups=None):
+        groups = groups if groups is not None else {}
+        names = sorted(groups.keys())
+        # Names are kept as str for the binary search, sys.intern shares them
+        # without keeping them alive
+        self.names = tuple(map(sys.intern, names))
+        # Members of names[i] are members[offsets[i]:offsets[i + 1]]
+        self.offsets = array('I', [0])
+        members = []
+        for name in names:
+            members.extend(groups[name])
+            self.offsets.append(len(members))
+        self.members = string_table.acquire(members)
+
+    def __del__(self):
+        # members isn't set if __init__ failed
+        members = getattr(self, 'members', None)
+        if members is not None:
+            string_table.release(members)
+
+    def find(self, name):
+        index = bisect_left(self.names, name)
+        if index < len(self.names) and self.names[index] == name:
+            return index
+        return -1
+
+    def group(self, index):
+        strings = string_table.strings
+        return [strings[member] for member in self.members[self.offsets[index] : self.offsets[index + 1]]]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return self.find(name) >= 0
+
+    def __getitem__(self, name):
+        index = self.find(name)
+        if index < 0:
+            raise KeyError(name)
+        return self.group(index)
+
+    def get(self, name, default=None):
+        index = self.find(name)
+        return self.group(index) if index >= 0 else default
+
+    def keys(self):
+        return self.names
+
+    def items(self):
+        for index, name in enumerate(self.names):
+            yield (name, self.group(index))
+
+    def __reduce__(self):
+        return (GroupTable, (dict(self.items()),))
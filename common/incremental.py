@@ -0,0 +1,71 @@
+from ..text_processing import split_top_level_blocks
+
+# Top-level blocks are parsed in units of about this many blocks, parsing
+# every small block on its own costs more in setup than it saves
+BLOCKS_PER_UNIT = 16
+
+def top_level_blocks(str):
+    # Default split of IncrementalParser, top-level blocks need no header
+    return [("", block) for block in split_top_level_blocks(str)]
+
+def group_blocks(blocks):
+    # Joins consecutive (header, block) pairs into (header, unit) pairs, the
+    # header of a unit is the one of its first block. A unit ends after a
+    # block picked by its own content, so editing one block doesn't move the
+    # other boundaries.
+    units = []
+    unit = []
+    header = ""
+    for (block_header, block) in blocks:
+        if len(unit) == 0:
+            header = block_header
+        unit.append(block)
+        if hash(block) % BLOCKS_PER_UNIT == 0:
+            units.append((header, "".join(unit)))
+            unit = []
+    if len(unit) > 0:
+        units.append((header, "".join(unit)))
+    return units
+
+class IncrementalParser:
+    # Remembers the parse result of every unit of top-level blocks of each
+    # view. When a view is parsed again only the units modified since the last
+    # parse go through parse_unit, the others come from the cache.
+    #
+    # split(str) returns the blocks of str as (header, block) pairs, joining
+    # the blocks gives back str. The header is text that a block starting
+    # inside of a declaration needs in front of it to be parsed on its own,
+    # e.g. the "class Foo {" of a piece of a long class body. Units are
+    # parsed with the header of their first block.
+    def __init__(self, parse_unit, split=None):
+        self.parse_unit = parse_unit
+        self.split = split if split is not None else top_level_blocks
+        self.units = {}
+
+    def parse(self, view_id, str, map=map):
+        # Returns the results of parse_unit for every unit, in order. The
+        # units that need parsing are independent of each other and are all
+        # handed to map at once, so a parallel map can spread them out.
+        return [result for (unit, result) in self.parse_units(view_id, str, map)]
+
+    def parse_units(self, view_id, str, map=map):
+        # Same as parse, with the unit of each result. Joining the units
+        # gives back str.
+        previous = self.units.get(view_id, {})
+        units = group_blocks(self.split(str))
+        current = {}
+        missing = []
+        for unit in units:
+            if unit in previous:
+                current[unit] = previous[unit]
+            elif unit not in current:
+                current[unit] = None
+                missing.append(unit)
+        results = map(self.parse_unit, [header + unit for (header, unit) in missing])
+        for unit, result in zip(missing, results):
+            current[unit] = result
+        self.units[view_id] = current
+        return [(unit, current[(header, unit)]) for (header, unit) in units]
+
+    def forget(self, view_id):
+        self.units.pop(view_id, None)
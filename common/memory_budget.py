@@ -0,0 +1,54 @@
+from .utils import get_setting
+
+from collections import OrderedDict
+import threading
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+# Parsed views keep their text in the incremental parser cache plus the
+# suggestions found in it, roughly twice the size of the text
+ESTIMATED_BYTES_PER_CHAR = 2
+
+class MemoryBudget:
+    # Estimated memory used by the parsed data of each view, least recently
+    # used first. Once the total is over the "memory_budget_mb" setting the
+    # least recently used views are dropped through owner.forget_view(view_id).
+    # An owner is a listener, several of them can keep data for the same view.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total = 0
+
+    def touch(self, owner, view_id, text_length=None):
+        # Marks the data of owner for view_id as the most recently used, with
+        # its new size if it was parsed again
+        key = (owner, view_id)
+        with self.lock:
+            size = self.entries.pop(key, 0)
+            if text_length is not None:
+                self.total = self.total - size
+                size = text_length * ESTIMATED_BYTES_PER_CHAR
+                self.total = self.total + size
+            self.entries[key] = size
+        self.evict()
+
+    def remove(self, owner, view_id):
+        with self.lock:
+            self.total = self.total - self.entries.pop((owner, view_id), 0)
+
+    def evict(self):
+        budget = get_setting('memory_budget_mb', DEFAULT_MEMORY_BUDGET_MB) * 1000000
+        evicted = []
+        with self.lock:
+            # The most recently used one is kept whatever its size
+            while self.total > budget and len(self.entries) > 1:
+                (key, size) = self.entries.popitem(last=False)
+                self.total = self.total - size
+                evicted.append(key)
+        for (owner, view_id) in evicted:
+            owner.forget_view(view_id)
+
+    def stats(self):
+        with self.lock:
+            return { 'views': len(self.entries), 'estimated_bytes': self.total }
+
+memory_budget = MemoryBudget()
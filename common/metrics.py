@@ -0,0 +1,120 @@
+# Latency histograms of the hot paths and item counts per view, dumped by the
+# kt_autocomplete_metrics command. Nothing is recorded unless the
+# "collect_metrics" setting is true, timer() then returns a shared object
+# doing nothing. Doesn't import sublime, parse worker processes don't report.
+
+from ..text_processing import scan_text, scan_text_iter
+
+from collections import deque
+import threading
+import time
+
+# Percentiles are computed over the latest samples of each phase
+MAX_SAMPLES = 1000
+PERCENTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    def __init__(self):
+        self.samples = deque(maxlen=MAX_SAMPLES)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count = self.count + 1
+        self.total = self.total + seconds
+
+    def percentiles(self):
+        samples = sorted(self.samples)
+        if len(samples) == 0:
+            return [0.0 for p in PERCENTILES]
+        return [samples[min(len(samples) - 1, int(p * len(samples)))] for p in PERCENTILES]
+
+class Timer:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return False
+
+NO_TIMER = NoTimer()
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.histograms = {}
+        # store -> {view_id: number of items}
+        self.items = {}
+
+    def timer(self, name):
+        # with metrics.timer("phase"): ...
+        if not self.enabled:
+            return NO_TIMER
+        return Timer(self, name)
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        with self.lock:
+            histogram.record(seconds)
+
+    def set_items(self, store, view_id, count):
+        if self.enabled:
+            with self.lock:
+                self.items.setdefault(store, {})[view_id] = count
+
+    def forget_view(self, view_id):
+        with self.lock:
+            for counts in self.items.values():
+                counts.pop(view_id, None)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.items = {}
+
+    def report(self):
+        # Text table of the histograms and item counts
+        with self.lock:
+            histograms = [(name, histogram.count, histogram.total, histogram.percentiles())
+                for name, histogram in self.histograms.items()]
+            items = [(store, dict(counts)) for store, counts in self.items.items()]
+        lines = []
+        if not self.enabled:
+            lines.append('Metrics are off, set "collect_metrics" to true to record them.')
+            lines.append('')
+        lines.append("%-36s %8s %10s %10s %10s %10s" % ("phase", "count", "p50 ms", "p95 ms", "p99 ms", "total s"))
+        for (name, count, total, percentiles) in sorted(histograms):
+            lines.append("%-36s %8d %10.3f %10.3f %10.3f %10.3f" % ((name, count) +
+                tuple(p * 1000 for p in percentiles) + (total,)))
+        lines.append('')
+        lines.append("%-36s %8s %10s %10s" % ("items", "views", "total", "max"))
+        for (store, counts) in sorted(items):
+            values = list(counts.values())
+            lines.append("%-36s %8d %10d %10d" % (store, len(values), sum(values), max(values) if values else 0))
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def timed_scan_text(name, str, rules):
+    # scan_text_iter, timed as the "scan.<name>" phase when metrics are on
+    if not metrics.enabled:
+        return scan_text_iter(str, rules)
+    with metrics.timer('scan.' + name):
+        return scan_text(str, rules)
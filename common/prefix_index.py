@@ -0,0 +1,55 @@
+from bisect import bisect_left, insort
+import threading
+
+class PrefixIndex:
+    # Sorted index of the suggestions of all views for case insensitive
+    # prefix lookups. Words are reference counted by the views containing them,
+    # so reparsing or dropping a view only touches the words it added or
+    # removed.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = []
+        self.counts = {}
+        self.view_words = {}
+
+    def update(self, view_id, words):
+        words = set(words)
+        with self.lock:
+            old_words = self.view_words.get(view_id, set())
+            for word in words - old_words:
+                self.add_word(word)
+            for word in old_words - words:
+                self.discard_word(word)
+            if len(words) > 0:
+                self.view_words[view_id] = words
+            else:
+                self.view_words.pop(view_id, None)
+
+    def remove(self, view_id):
+        self.update(view_id, [])
+
+    def add_word(self, word):
+        count = self.counts.get(word, 0)
+        if count == 0:
+            insort(self.keys, (word.lower(), word))
+        self.counts[word] = count + 1
+
+    def discard_word(self, word):
+        count = self.counts[word] - 1
+        if count == 0:
+            del self.counts[word]
+            key = (word.lower(), word)
+            del self.keys[bisect_left(self.keys, key)]
+        else:
+            self.counts[word] = count
+
+    def lookup(self, prefix):
+        # Words starting with prefix, ignoring case, in sorted order
+        lower = prefix.lower()
+        with self.lock:
+            begin = bisect_left(self.keys, (lower,))
+            end = bisect_left(self.keys, (lower + '\U0010ffff',))
+            return [word for (key, word) in self.keys[begin:end]]
+
+    def __len__(self):
+        return len(self.counts)
@@ -0,0 +1,87 @@
+import heapq
+import threading
+from collections import OrderedDict
+
+# Completions handed to Sublime per provider
+MAX_COMPLETIONS = 300
+
+SAME_VIEW_BOOST = 20
+RECENT_BOOST = 40
+MAX_RECENT_COMPLETIONS = 200
+
+# Match tiers, compared before the scores: words starting with what was typed
+# in the same case always come first, then the ones starting with it in
+# another case, then the other fuzzy matches
+EXACT_PREFIX_TIER = 2
+PREFIX_TIER = 1
+FUZZY_TIER = 0
+
+def fuzzy_score(prefix, word):
+    # (tier, score) of how well word matches what was typed, higher is
+    # better. The score orders the words of a tier, shorter words first for
+    # prefix matches. None when the characters of prefix don't appear in word
+    # in order, ignoring case.
+    if prefix == "":
+        return (FUZZY_TIER, 0)
+    if word.startswith(prefix):
+        return (EXACT_PREFIX_TIER, -len(word))
+    lower_word = word.lower()
+    if lower_word.startswith(prefix.lower()):
+        return (PREFIX_TIER, -len(word))
+
+    score = 100 - len(word)
+    position = -1
+    for c in prefix.lower():
+        found = lower_word.find(c, position + 1)
+        if found == -1:
+            return None
+        if found == position + 1:
+            score = score + 5
+        else:
+            score = score - (found - position - 1)
+        # start of a word part: fooBar, foo_bar, foo.bar
+        if found == 0 or word[found - 1] in "_." or (word[found].isupper() and not word[found - 1].isupper()):
+            score = score + 10
+        position = found
+    return (FUZZY_TIER, score)
+
+class RecentCompletions:
+    # Words of the latest committed completions, most recent last
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.words = OrderedDict()
+
+    def record(self, word):
+        with self.lock:
+            self.words.pop(word, None)
+            self.words[word] = True
+            if len(self.words) > MAX_RECENT_COMPLETIONS:
+                self.words.popitem(last=False)
+
+    def boost(self, word):
+        return RECENT_BOOST if word in self.words else 0
+
+recent_completions = RecentCompletions()
+
+def completion_word(completion):
+    # The part of the trigger before the annotation
+    return completion[0].split("\t", 1)[0]
+
+def rank_completions(completions, prefix, limit=MAX_COMPLETIONS, same_view_words=None):
+    # Best limit completions for prefix, best first. completions are
+    # (trigger, contents) tuples, the ones not matching prefix are dropped.
+    # Words in same_view_words get a boost, and so do recently committed ones.
+    def scored():
+        for index, completion in enumerate(completions):
+            word = completion_word(completion)
+            match = fuzzy_score(prefix, word)
+            if match is None:
+                continue
+            (tier, score) = match
+            # Boosts reorder the words of a tier, never move them to another
+            if same_view_words is not None and word in same_view_words:
+                score = score + SAME_VIEW_BOOST
+            score = score + recent_completions.boost(word)
+            # ties keep the original order
+            yield (tier, score, -index, completion)
+    return [completion for (tier, score, index, completion) in heapq.nlargest(limit, scored())]
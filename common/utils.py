@@ -1,5 +1,7 @@
 import sublime, sublime_plugin
 
+from .ranking import rank_completions
+
 def dedup_strings(strs):
     res = []
     ss = set()
@@ -9,16 +11,16 @@ def dedup_strings(strs):
             res.append(s)
     return res
 
-def get_autocompletion(view, prefix, prefix_to_remove, locations, stored_suggestions):
+def get_autocompletion(view, prefix, prefix_to_remove, locations, suggestion_index):
+    # suggestion_index is a PrefixIndex, only the suggestions starting with
+    # what was typed are looked at
     results = []
-    for view_id, suggestions_per_view in stored_suggestions.items():
-        for suggestion in suggestions_per_view:
-            if suggestion.startswith(prefix_to_remove):
-                suggestion = suggestion[len(prefix_to_remove):]
-            results.append(suggestion)
-    results = dedup_strings(results)
-    return [(suggestion + "\t" + ":", suggestion.replace('$', '\\$'))
-        for suggestion in results]
+    for suggestion in suggestion_index.lookup(prefix_to_remove + prefix):
+        if suggestion[:len(prefix_to_remove)].lower() == prefix_to_remove.lower():
+            suggestion = suggestion[len(prefix_to_remove):]
+        results.append(suggestion)
+    return rank_completions([(suggestion + "\t" + ":", suggestion.replace('$', '\\$'))
+        for suggestion in results], prefix)
 
 def comment_and_empty_line_remove(content):
     arr = content.split("\n")
@@ -31,13 +33,30 @@ def comment_and_empty_line_remove(content):
             results.append(s)
     return "\n".join(results)
 
+SETTINGS_FILE = 'autocomplete.sublime-settings'
+
+# Buffers bigger than this only get a cheap partial parse
+DEFAULT_MAX_PARSE_SIZE = 5000000
+
+def get_setting(key, default):
+    value = sublime.load_settings(SETTINGS_FILE).get(key)
+    if value is None:
+        return default
+    return value
+
+# Set in the settings file of the package, the settings are not loaded yet
+# while it's missing
+SETTINGS_LOADED_KEY = 'max_parse_size'
+
 def wait_for_settings_and_do(settings, key, func):
+    # Calls func with the value of key once the settings are loaded, not at
+    # all if key isn't set
     def wait_for_settings_and_do_recursive(settings, key, func, wait_time):
-        loaded_settings = sublime.load_settings(settings).get(key)
-        if loaded_settings is None:
+        loaded_settings = sublime.load_settings(settings)
+        if loaded_settings.get(SETTINGS_LOADED_KEY) is None:
             print("Fail to load ", settings)
             sublime.set_timeout(lambda: wait_for_settings_and_do_recursive(settings, key, func, wait_time * 2), wait_time)
-        else:
+        elif loaded_settings.get(key) is not None:
             print("Success to load ", settings)
-            func(loaded_settings)
+            func(loaded_settings.get(key))
     wait_for_settings_and_do_recursive(settings, key, func, 200)
@@ -0,0 +1,107 @@
+import sublime
+
+from .utils import get_setting
+
+import threading
+
+# Parsing is pure Python, threads can't run it in parallel but processes can.
+# Worker processes need a standalone python executable since the plugin host
+# can't be started as one, so the pool is only used once "parse_workers" and
+# "parse_worker_python" are set. Without them everything is parsed inline.
+
+class WorkerPool:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.config = None
+        self.failed_config = None
+
+    def get_executor(self):
+        config = (get_setting('parse_workers', 0), get_setting('parse_worker_python', None))
+        with self.lock:
+            if config == self.config:
+                return self.executor
+            self.shutdown_executor()
+            self.config = config
+            workers, python = config
+            if workers > 0 and python is not None and config != self.failed_config:
+                self.executor = create_executor(workers, python)
+            return self.executor
+
+    def map(self, fn, items):
+        # Same as list(map(fn, items)), fn must be a module level function
+        items = list(items)
+        executor = None
+        if len(items) > 1:
+            executor = self.get_executor()
+        if executor is None:
+            return list(map(fn, items))
+        try:
+            chunksize = max(1, len(items) // (self.config[0] * 4))
+            return list(executor.map(fn, items, chunksize=chunksize))
+        except Exception as e:
+            # e.g. the package is zipped and can't be imported by the workers
+            print("Parse workers failed, parsing inline from now on: ", e)
+            with self.lock:
+                self.failed_config = self.config
+                self.config = None
+                self.shutdown_executor()
+            return list(map(fn, items))
+
+    def shutdown_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def shutdown(self):
+        with self.lock:
+            self.config = None
+            self.shutdown_executor()
+
+def create_executor(workers, python):
+    try:
+        import concurrent.futures
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(python)
+        return concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+    except Exception as e:
+        print("Can't start parse workers: ", e)
+        return None
+
+worker_pool = WorkerPool()
+
+class ParseScheduler:
+    # Runs parse jobs on the async thread with at most one job in flight per
+    # view. A job scheduled while the previous one of the same view is still
+    # waiting replaces it, the content that one would parse is outdated.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiting = {}
+        self.busy = set()
+
+    def schedule(self, view_id, job):
+        with self.lock:
+            self.waiting[view_id] = job
+            if view_id in self.busy:
+                return
+            self.busy.add(view_id)
+        sublime.set_timeout_async(lambda: self.run(view_id), 0)
+
+    def cancel(self, view_id):
+        # Drops the job waiting for view_id, a running one still finishes
+        with self.lock:
+            self.waiting.pop(view_id, None)
+
+    def run(self, view_id):
+        with self.lock:
+            job = self.waiting.pop(view_id, None)
+        try:
+            if job is not None:
+                job()
+        finally:
+            with self.lock:
+                if view_id not in self.waiting:
+                    self.busy.discard(view_id)
+                    return
+        sublime.set_timeout_async(lambda: self.run(view_id), 0)
@@ -1,58 +1,110 @@
-import sublime, sublime_plugin
-
-from .text_processing import *
-from .common.utils import *
+# Doesn't import sublime so it can run in parse worker processes.
 
 import re
+import codecs
 
-def construct_func_objc(str):
-    lines = str.split('\n')
-    func_rules = [
-        StringMatchExpectation("- ("),
-        BackwardExpectation(1),
-        MatchBracketExpectation("(", ")"),
-        SpacePrefixedWordExpectation().save().loop(),
-        StringMatchExpectation(":"),
-        MatchBracketExpectation("(", ")"),
-        WordExpectation().save(),
-    ]
-
-    interface_rules = [
-        StringMatchExpectation("@interface"),
-        SpacePrefixedWordExpectation().save()
-    ]
-
-    last_interface = None
-    results = []
-    for line in lines:
-        sline = line.strip()
-
-        if sline.find("@interface ") >= 0:
-            res = scan_text(sline, interface_rules)
-            if len(res) > 0:
-                last_interface = res[0][0]
-        elif sline.startswith("- (instancetype)") or sline.startswith("- (nullable instancetype)"):
-            res = scan_text(sline, func_rules)
-            if len(res) > 0 and last_interface is not None:
-                current_index = 1
-                func_name = res[0][0]
-                prefix = "initWith"
-                if func_name.startswith(prefix) and len(func_name) > len(prefix):
-                    func_name = func_name[len(prefix):]
+def selector_snippet(first_label, parts):
+    # parts are the (label, variable) pairs of a selector. The first one is
+    # labeled with first_label, or left unlabeled when it's None.
+    snippets = []
+    for (index, (label, variable)) in enumerate(parts):
+        if index == 0:
+            label = first_label
+        if label is None:
+            snippets.append("${%d:%s}" % (index + 1, variable))
+        else:
+            snippets.append("%s: ${%d:%s}" % (label, index + 1, variable))
+    return ", ".join(snippets)
+
+# Comments are blanked, string literals are matched so that // in them is kept
+COMMENTS = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:[^"\\\n]|\\.)*"', re.S)
+
+# Up to two levels of nested parentheses, enough for block types
+PARENTHESES = r'\((?:[^()]|\((?:[^()]|\([^()]*\))*\))*\)'
+
+DECLARATIONS = re.compile(r'''
+    @interface\s+(?P<interface>\w+)(?:<[^>]*>)?
+        \s*(?:\(\s*\w*\s*\))?
+        \s*(?::\s*(?P<superclass>\w+)(?:<[^>]*>)?)?
+        \s*(?:<(?P<interface_protocols>[^>]*)>)?
+    |@protocol\s+(?P<protocol>\w+)\b(?!\s*[;,])
+        \s*(?:<(?P<protocol_protocols>[^>]*)>)?
+    |(?P<end>@end)
+    |^[ \t]*(?P<kind>[-+])\s*(?P<return_type>''' + PARENTHESES + r''')\s*(?P<selector>[^;{}@]*)[;{]
+    |@property\s*(?:\([^)]*\))?(?P<property>[^;{}@]*);
+    ''', re.M | re.X)
+
+SELECTOR_PART = re.compile(r'(\w+)\s*:\s*' + PARENTHESES + r'\s*(\w+)')
+SELECTOR_NAME = re.compile(r'\s*(\w+)')
+# Availability and nullability macros, e.g. NS_AVAILABLE_IOS(8_0)
+MACROS = re.compile(r'\b[A-Z][A-Z0-9_]+\b(?:\s*\([^()]*\))?')
+BLOCK_NAME = re.compile(r'\(\s*\^\s*(\w+)\s*\)')
+LAST_WORD = re.compile(r'(\w+)\s*(?:\[[^\]]*\]\s*)*\Z')
+
+INIT_PREFIX = "initWith"
+
+def property_name(declaration):
+    block = BLOCK_NAME.search(declaration)
+    if block is not None:
+        return block.group(1)
+    name = LAST_WORD.search(MACROS.sub(" ", declaration).rstrip())
+    return name.group(1) if name is not None else None
+
+def add_member(members, container, member):
+    if container is not None and member is not None:
+        members.setdefault(container, [])
+        if member not in members[container]:
+            members[container].append(member)
+
+def construct_declarations_objc(str):
+    # One pass over a header. Returns (param suggestions, {class or
+    # protocol: [methods and properties]}, {class or protocol: [superclass
+    # and protocols]}). Categories add to their class. Declarations can span
+    # several lines.
+    str = COMMENTS.sub(lambda match: match.group(0) if match.group(0).startswith('"') else " ", str)
+    params = []
+    members = {}
+    supertypes = {}
+    container = None
+    for match in DECLARATIONS.finditer(str):
+        if match.group('interface') is not None or match.group('protocol') is not None:
+            container = match.group('interface') or match.group('protocol')
+            inherited = []
+            if match.group('superclass') is not None:
+                inherited.append(match.group('superclass'))
+            protocols = match.group('interface_protocols') or match.group('protocol_protocols')
+            if protocols is not None:
+                inherited.extend(protocol.strip() for protocol in protocols.split(","))
+            for supertype in inherited:
+                if supertype != "":
+                    add_member(supertypes, container, supertype)
+        elif match.group('end') is not None:
+            container = None
+        elif match.group('kind') is not None:
+            selector = match.group('selector')
+            parts = SELECTOR_PART.findall(selector)
+            if len(parts) == 0:
+                name = SELECTOR_NAME.match(selector)
+                add_member(members, container, name.group(1) if name is not None else None)
+                continue
+            func_name = parts[0][0]
+            add_member(members, container, func_name)
+            if match.group('kind') == "-" and "instancetype" in match.group('return_type'):
+                if container is None:
+                    continue
+                if func_name.startswith(INIT_PREFIX) and len(func_name) > len(INIT_PREFIX):
+                    func_name = func_name[len(INIT_PREFIX):]
                     func_name = func_name[:1].lower() + func_name[1:]
-                s = "{2}: ${{{0}:{1}}}".format(current_index, res[0][1], func_name)
-                for i in range(1, len(res)):
-                    current_index = current_index + 1
-                    s = s + ", {1}: ${{{0}:{2}}}".format(current_index, res[i][0], res[i][1])
-                results.append((last_interface, s))
-        elif sline.startswith("- ("):
-            res = scan_text(sline, func_rules)
-            if len(res) > 0:
-                current_index = 1
-                func_name = res[0][0]
-                s = "${{{0}:{1}}}".format(current_index, res[0][1])
-                for i in range(1, len(res)):
-                    current_index = current_index + 1
-                    s = s + ", {1}: ${{{0}:{2}}}".format(current_index, res[i][0], res[i][1])
-                results.append((func_name, s))
-    return results
+                params.append((container, selector_snippet(func_name, parts)))
+            else:
+                params.append((func_name, selector_snippet(None, parts)))
+        else:
+            add_member(members, container, property_name(match.group('property')))
+    return (params, members, supertypes)
+
+def construct_func_objc(str):
+    return construct_declarations_objc(str)[0]
+
+def construct_declarations_objc_from_file(path):
+    with codecs.open(path, 'r', encoding='utf-8') as f:
+        return construct_declarations_objc(f.read())
@@ -0,0 +1,225 @@
+# On-disk index of the suggestions parsed from the files of a preload folder.
+# Doesn't import sublime so it can be used outside of the editor.
+#
+# The index is a single append-only file: a magic string, then one record per
+# parsed file. A record is two little endian uint32 lengths followed by a
+# pickled header (path, mtime_ns, size, keys) and the pickled suggestions. A
+# later record for the same path replaces the earlier one. keys maps the keys
+# of the suggestions dict to the keys of their value when it's a dict, e.g.
+# the type names of a {type: [member]} table, to None otherwise. The file is
+# memory-mapped, only the headers are read when it's opened and suggestions
+# are unpickled when completion needs them.
+
+import mmap
+import os
+import pickle
+import struct
+import threading
+
+MAGIC = b"KTACIDX2"
+RECORD_LENGTHS = struct.Struct("<II")
+
+# Rewrite the file once this share of it holds replaced or deleted records
+MAX_GARBAGE_RATIO = 0.5
+
+class PreloadIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.map = None
+        # path -> (mtime_ns, size, keys, start of the record, offset and
+        # length of the suggestions)
+        self.entries = {}
+        self.end = len(MAGIC)
+        self.garbage = 0
+        # Set by shutdown, the file isn't written anymore
+        self.stopped = False
+        self.load()
+
+    def load(self):
+        self.close()
+        self.entries = {}
+        self.end = len(MAGIC)
+        self.garbage = 0
+        directory = os.path.dirname(self.path)
+        if directory != "" and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < len(MAGIC):
+            with open(self.path, "wb") as f:
+                f.write(MAGIC)
+        self.file = open(self.path, "r+b")
+        self.remap()
+        if self.map[:len(MAGIC)] != MAGIC:
+            # Unknown format, start over
+            self.close()
+            with open(self.path, "wb") as f:
+                f.write(MAGIC)
+            self.file = open(self.path, "r+b")
+            self.remap()
+
+        position = len(MAGIC)
+        size = len(self.map)
+        while position + RECORD_LENGTHS.size <= size:
+            (header_length, length) = RECORD_LENGTHS.unpack_from(self.map, position)
+            offset = position + RECORD_LENGTHS.size + header_length
+            if offset + length > size:
+                break
+            try:
+                (path, mtime, file_size, keys) = pickle.loads(self.map[position + RECORD_LENGTHS.size : offset])
+            except Exception:
+                break
+            if path in self.entries:
+                self.garbage = self.garbage + self.record_size(self.entries[path])
+            self.entries[path] = (mtime, file_size, keys, position, offset, length)
+            position = offset + length
+        self.end = position
+        if position < size:
+            # Left by an interrupted write
+            self.map.close()
+            self.map = None
+            self.file.truncate(position)
+            self.remap()
+
+    def remap(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def shutdown(self):
+        # Once it returns nothing is written to the file by this object, so
+        # another one can append to it
+        with self.lock:
+            self.stopped = True
+
+    @staticmethod
+    def record_size(entry):
+        (mtime, size, keys, start, offset, length) = entry
+        return offset + length - start
+
+    def is_valid(self, path, mtime, size):
+        # True if the index has suggestions for this version of the file
+        entry = self.entries.get(path)
+        return entry is not None and entry[0] == mtime and entry[1] == size
+
+    def keys(self, path):
+        return self.entries[path][2]
+
+    def get(self, path):
+        with self.lock:
+            (mtime, size, keys, start, offset, length) = self.entries[path]
+            if offset + length > len(self.map):
+                self.remap()
+            return pickle.loads(self.map[offset : offset + length])
+
+    def add(self, path, mtime, size, suggestions):
+        # False if the index was shut down, nothing is written then
+        keys = record_keys(suggestions)
+        data = pickle.dumps(suggestions, pickle.HIGHEST_PROTOCOL)
+        header = pickle.dumps((path, mtime, size, keys), pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            if self.stopped:
+                return False
+            start = self.end
+            self.file.seek(start)
+            self.file.write(RECORD_LENGTHS.pack(len(header), len(data)))
+            self.file.write(header)
+            self.file.write(data)
+            self.file.flush()
+            offset = start + RECORD_LENGTHS.size + len(header)
+            if path in self.entries:
+                self.garbage = self.garbage + self.record_size(self.entries[path])
+            self.entries[path] = (mtime, size, keys, start, offset, len(data))
+            self.end = offset + len(data)
+        return True
+
+    def retain(self, paths):
+        # Drops the entries of the files that are not in paths anymore and
+        # rewrites the file if too much of it is unused
+        with self.lock:
+            if self.stopped:
+                return
+            for path in list(self.entries.keys()):
+                if path not in paths:
+                    self.garbage = self.garbage + self.record_size(self.entries.pop(path))
+            if self.garbage <= self.end * MAX_GARBAGE_RATIO:
+                return
+            if self.end > len(self.map):
+                self.remap()
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(MAGIC)
+                for path, (mtime, size, keys, start, offset, length) in self.entries.items():
+                    header = pickle.dumps((path, mtime, size, keys), pickle.HIGHEST_PROTOCOL)
+                    f.write(RECORD_LENGTHS.pack(len(header), length))
+                    f.write(header)
+                    f.write(self.map[offset : offset + length])
+            # Windows can't replace a mapped file
+            self.close()
+            os.replace(temp_path, self.path)
+            self.load()
+
+def record_keys(suggestions):
+    keys = {}
+    for key, value in suggestions.items():
+        keys[key] = tuple(value.keys()) if isinstance(value, dict) else None
+    return keys
+
+class IndexedSuggestions:
+    # Suggestions of one preloaded file, read from the index the first time
+    # they are needed and passed through convert. Supports what completion
+    # does with the suggestion dicts.
+    def __init__(self, index, path, convert=None):
+        self.index = index
+        self.path = path
+        self.convert = convert
+        self.keys = index.keys(path)
+        self.data = None
+
+    def load(self):
+        if self.data is None:
+            data = self.index.get(self.path)
+            self.data = self.convert(data) if self.convert is not None else data
+        return self.data
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def get(self, key, default=None):
+        return self.load().get(key, default) if key in self.keys else default
+
+    def group(self, key):
+        # The dict under key as an IndexedGroup, None if there's none
+        if self.keys.get(key) is None:
+            return None
+        return IndexedGroup(self, key)
+
+class IndexedGroup:
+    # Dict stored under a key of IndexedSuggestions. Its keys come from the
+    # index header, the suggestions are only read once a value is needed.
+    def __init__(self, suggestions, key):
+        self.suggestions = suggestions
+        self.key = key
+
+    def keys(self):
+        return self.suggestions.keys[self.key]
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, name):
+        return name in self.keys()
+
+    def __getitem__(self, name):
+        return self.suggestions[self.key][name]
@@ -1,10 +1,13 @@
 import sublime, sublime_plugin
 
-from .common.base_listener import BaseViewDeactivatedListener
+# Not imported by name, Sublime would register the base class as a listener too
+from .common import base_listener
 from .common.utils import get_autocompletion
-from .text_processing import *
+from .common.prefix_index import PrefixIndex
+from .reactjs_parser import construct_reactjs_suggestions
 
 stored_suggestions = {}
+suggestion_index = PrefixIndex()
 
 def reactjs_autocompletion(view, prefix, locations):
     loc = locations[0]
@@ -20,31 +23,16 @@ def reactjs_autocompletion(view, prefix, locations):
     prefix_to_remove = ""
     if s.rfind('.') != -1:
         prefix_to_remove = s[:s.rfind('.') + 1]
-    return get_autocompletion(view, prefix, prefix_to_remove, locations, stored_suggestions)
+    return get_autocompletion(view, prefix, prefix_to_remove, locations, suggestion_index)
 
 
-class ReactJSNameExpectation(ConditionExpectationBase):
-    def canEmpty(self):
-        return False
-    def condition(self, c):
-        return c.isalnum() or c == "_" or c == '.'
-
-
-class ReactJSViewDeactivedListener(BaseViewDeactivatedListener):
-    def get_suggestions(self, str):
-        reactjs_name_rules = [
-            OneOfStringsMatchExpectation([" = React.createClass"]).loop(),
-            BeginOfLineExpectation(),
-            ReactJSNameExpectation().save(),
-        ]
-        suggestions = scan_text(str, reactjs_name_rules)
-        dotname_rules = [
-            ReactJSNameExpectation().save().loop(),
-        ]
-        dotname_suggestions = scan_text(str, dotname_rules)
-        dotname_suggestions = [s for s in dotname_suggestions if s[0].find(".") != -1 and not s[0].startswith("this")]
-        return [s[0] for s in suggestions + dotname_suggestions]
+class ReactJSViewDeactivedListener(base_listener.BaseViewDeactivatedListener):
+    get_suggestions = staticmethod(construct_reactjs_suggestions)
 
     def suggestion_storage(self):
         global stored_suggestions
         return stored_suggestions
+
+    def suggestion_index(self):
+        global suggestion_index
+        return suggestion_index
@@ -0,0 +1,30 @@
+# ReactJS parsing. Doesn't import sublime so it can run in parse worker processes.
+
+from .text_processing import *
+from .common.metrics import timed_scan_text
+
+import re
+
+class ReactJSNameExpectation(ConditionExpectationBase):
+    pattern = re.compile(r'[\w.]*')
+    def canEmpty(self):
+        return False
+    def condition(self, c):
+        return c.isalnum() or c == "_" or c == '.'
+
+REACTJS_NAME_RULES = [
+    OneOfStringsMatchExpectation([" = React.createClass"]).loop(),
+    BeginOfLineExpectation(),
+    ReactJSNameExpectation().save(),
+]
+
+DOTNAME_RULES = [
+    ReactJSNameExpectation().save().loop(),
+]
+
+def construct_reactjs_suggestions(str):
+    suggestions = [s[0] for s in timed_scan_text('REACTJS_NAME_RULES', str, REACTJS_NAME_RULES)]
+    for s in timed_scan_text('DOTNAME_RULES', str, DOTNAME_RULES):
+        if s[0].find(".") != -1 and not s[0].startswith("this"):
+            suggestions.append(s[0])
+    return suggestions
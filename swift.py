@@ -1,194 +1,29 @@
 import sublime, sublime_plugin
 
 from .text_processing import *
+from .swift_parser import *
 from .common.utils import *
-
-from .objc import construct_func_objc
+# Not imported by name, Sublime would register the base class as a listener too
+from .common import base_listener
+from .common.incremental import IncrementalParser
+from .common.workers import worker_pool
+from .common.ranking import rank_completions
+from .common.compact import PairList, GroupTable
+from .common.metrics import metrics
+
+from .objc import construct_declarations_objc_from_file
+from .preload_index import PreloadIndex, IndexedSuggestions
+from .swift_type_index import TypeIndex
 
 import re
 import threading
 import time
+import hashlib
+import os
+from collections import OrderedDict
 
 from os import listdir
 from os.path import isfile, join, expanduser
-import codecs
-
-import pickle
-
-def sublime_params_snippet_from_str(params_str, is_func):
-    if params_str.isspace() or params_str == "":
-        return "()"
-    else:
-        params = params_str.split(",")
-        fill_str = "("
-        is_first = True
-        current_index = 0
-        for param in params:
-            current_index = current_index + 1
-            match = re.match('\s*(\w+\s+)*(\w+)\s*:', param)
-
-
-            if not is_first:
-                fill_str = fill_str + ", "
-
-            param_name = None
-            param_var = None
-            if match is not None and len(match.groups()) == 2:
-                param_var = match.group(2)
-                if match.group(1) is not None:
-                    param_name = match.group(1).strip()
-                else:
-                    param_name = match.group(2)
-
-
-            if param_name is None or param_var is None:
-                fill_str = fill_str + "${0}".format(current_index)
-            else:
-                if is_first and is_func:
-                    fill_str = fill_str + "${{{0}:{1}}}${2}".format(current_index, param_var, current_index + 1)
-                    current_index = current_index + 1
-                else:
-                    fill_str = fill_str + "{1}: ${{{0}:{2}}}".format(current_index, param_name, param_var)
-
-            if is_first:
-                is_first = False
-
-        fill_str = fill_str + ")"
-        return fill_str
-
-def construct_suggestions_swift(str):
-    results = []
-
-    # functions
-    func_rules = [
-        StringMatchExpectation("func").loop(),
-        SpacesExpectation(),
-        WordExpectation().save(),
-        SpacesExpectation(),
-        MatchBracketExpectation("(", ")").save()
-    ]
-
-    start_time = time.time()
-    funcs = scan_text(str, func_rules)
-    # print("Parse time func = ", time.time() - start_time)
-    # print(funcs)
-
-    for func in funcs:
-        results.append((func[0], func[1]))
-
-    # init methods
-    class_inits_rules = [
-        StringMatchExpectation("class").loop(),
-        SpacesExpectation(),
-        WordExpectation().save(),
-        StringMatchExpectation("{"),
-        BackwardExpectation(1),
-        MatchBracketExpectation("{", "}").nested(),
-        StringMatchExpectation(" init"),
-        SpacesExpectation(),
-        MatchBracketExpectation("(", ")").save()
-    ]
-
-    struct_inits_rules = [
-        StringMatchExpectation("struct").loop(),
-        SpacesExpectation(),
-        WordExpectation().save(),
-        StringMatchExpectation("{"),
-        BackwardExpectation(1),
-        MatchBracketExpectation("{", "}").save().transform([
-            OneOfStringsMatchExpectation(["let", "var"]).loop(),
-            SpacesExpectation(),
-            WordExpectation().save()
-        ]),
-    ]
-
-    start_time = time.time()
-    class_inits = scan_text(str, class_inits_rules)
-    # print("Parse time class = ", time.time() - start_time)
-    # print(class_inits)
-    for class_init in class_inits:
-            results.append((class_init[0], class_init[1]))
-
-    suggestions = []
-
-    for result in results:
-        func_name, params_str = result
-        params_str = params_str[1:-1]
-        snippet = sublime_params_snippet_from_str(params_str, func_name[0:1].islower())
-        if snippet != "()":
-            suggestions.append((func_name, snippet[1:-1]))
-
-    start_time = time.time()
-    structs = scan_text(str, struct_inits_rules)
-    # print("Parse time = ", time.time() - start_time)
-    # print(structs)
-    for struct in structs:
-        func_name = struct[0]
-        params = struct[1]
-        if len(params) > 0:
-            # snippet = "("
-            snippet = ""
-            is_first = True
-            current_index = 0
-            for param in params:
-                current_index = current_index + 1
-                if not is_first:
-                    snippet = snippet + ", "
-                snippet = snippet + "{1}: ${{{0}}}".format(current_index, param[0])
-                if is_first:
-                    is_first = False
-            # snippet = snippet + ")"
-            suggestions.append((func_name, snippet))
-    return suggestions
-
-def construct_links(str):
-    class_funcs_rules = [
-        OneOfStringsMatchExpectation(["class", "protocol"]).loop(),
-        SpacesExpectation(),
-        WordExpectation().save(),
-        StringMatchExpectation("{"),
-        BackwardExpectation(1),
-        MatchBracketExpectation("{", "}").nested(),
-        OneOfStringsMatchExpectation(["func", "var", "let"]).loop(),
-        AtLeastOneSpacesExpectation(),
-        WordExpectation().save()
-    ]
-    links = scan_text(str, class_funcs_rules)
-    class_to_func = {}
-    for link in links:
-        if len(link) == 2:
-            if link[0] in class_to_func:
-                class_to_func[link[0]].append(link[1])
-            else:
-                class_to_func[link[0]] = [link[1]]
-
-    #print(links)
-    #print(class_to_func)
-    return class_to_func
-
-def construct_enum_suggestions(str):
-    enum_cases_rules = [
-        StringMatchExpectation("enum ").loop(),
-        SpacesExpectation(),
-        WordExpectation().save(),
-        StringMatchExpectation("{"),
-        BackwardExpectation(1),
-        MatchBracketExpectation("{", "}").nested(),
-        StringMatchExpectation("case ").loop(),
-        SpacesExpectation(),
-        WordExpectation().save()
-    ]
-
-    enum_cases = scan_text(str, enum_cases_rules)
-    enum_to_cases = {}
-    for enum_case in enum_cases:
-        if len(enum_case) == 2:
-            (enum, case) = enum_case
-            if enum in enum_to_cases:
-                enum_to_cases[enum].append(case)
-            else:
-                enum_to_cases[enum] = [case]
-    return enum_to_cases
 
 def completion_for_cases(cases):
     return "\ncase .".join(map(lambda x: x + ":", cases))
@@ -204,7 +39,7 @@ def swift_autocompletion_case_enum(view, prefix, location):
             for enum, cases in suggestions_per_view[ENUM_KEY].items():
                 for case in cases:
                     results.append((case, case))
-    return filter_duplicate(results)
+    return rank_completions(filter_duplicate(results), prefix)
 
 def swift_autocompletion_enum(view, prefix, location):
     results = []
@@ -213,7 +48,7 @@ def swift_autocompletion_enum(view, prefix, location):
             for enum, cases in suggestions_per_view[ENUM_KEY].items():
                 for case in cases:
                     results.append((enum + "." + case, case))
-    return results
+    return rank_completions(results, prefix)
 
 
 def filter_suggestion_for_prefix(suggestions, prefix):
@@ -248,9 +83,24 @@ class InsertBracketCommand(sublime_plugin.TextCommand):
 
 ENUM_KEY = 'enum'
 METHOD_KEY = 'method'
+SUPERTYPE_KEY = 'supertype'
 PARAM_KEY = 'param'
 
 suggestions = {}
+# view_id -> SymbolTable of the view as of its last parse
+symbol_tables = {}
+# Members of the types of all the parsed views and preloaded files
+type_index = TypeIndex()
+
+def index_types(key, suggestions_per_view):
+    type_index.update(key, suggestions_per_view.get(METHOD_KEY), suggestions_per_view.get(SUPERTYPE_KEY))
+
+def compact_suggestions(view_suggestions):
+    # The same suggestions in compact tables, see common/compact.py
+    results = {}
+    for key, value in view_suggestions.items():
+        results[key] = PairList(value) if key == PARAM_KEY else GroupTable(value)
+    return results
 
 def swift_autocompletion(view, prefix, locations):
     results = []
@@ -276,9 +126,11 @@ def swift_autocompletion(view, prefix, locations):
         view.run_command("insert_bracket")
         return results
     #print(results)
-    return results
+    return rank_completions(results, prefix)
 
-previous_guess = {}
+# Last type guessed for each variable name, least recently used first
+previous_guess = OrderedDict()
+MAX_PREVIOUS_GUESSES = 1000
 
 def try_to_guess_type(variable, str):
     global previous_guess
@@ -294,10 +146,15 @@ def try_to_guess_type(variable, str):
     #print(types)
     if len(types) > 0:
         type = types[len(types) - 1][0]
+        previous_guess.pop(variable, None)
         previous_guess[variable] = type
+        if len(previous_guess) > MAX_PREVIOUS_GUESSES:
+            previous_guess.popitem(last=False)
         return type
     if variable in previous_guess:
-        return previous_guess[variable]
+        type = previous_guess.pop(variable)
+        previous_guess[variable] = type
+        return type
     return None
 
 def grab_lines(view, position):
@@ -318,134 +175,245 @@ def swift_autocompletion_call(view, prefix, locations):
     word_range = view.word(locations[0] - 2)
     word = view.substr(word_range)
 
-    str = grab_lines(view, word_range.begin())
-
-    word_type = try_to_guess_type(word, str)
+    word_type = None
+    symbol_table = symbol_tables.get(view.id())
+    if symbol_table is not None:
+        # The view may have been edited since, declarations that moved are skipped
+        is_current = lambda start: view.substr(sublime.Region(start, start + len(word))) == word
+        word_type = symbol_table.type_at(word, word_range.begin(), is_current)
+    if word_type is None:
+        str = grab_lines(view, word_range.begin())
+        word_type = try_to_guess_type(word, str)
 
     if word_type is not None:
         print("Guess type = ", word_type)
-        for view_id, suggestions_per_view in suggestions.items():
-            if METHOD_KEY in suggestions_per_view:
-                method_suggestions = suggestions_per_view[METHOD_KEY]
-                # print("Method suggestions = ", method_suggestions)
-                if word_type in method_suggestions:
-                    funcs = method_suggestions[word_type]
-                    # print("Has ", word_type, " get ", funcs)
-                    for func in funcs:
-                        results.append((func + "\t" + "+", func))
-    return filter_duplicate(results)
-
-def indentation_heuristic(content):
-    indentation = 4
-    num_indentation = 1
-
-    arr = content.split("\n")
-    stack = []
+        # Members from every file, inherited ones included
+        for func in type_index.members(word_type):
+            results.append((func + "\t" + "+", func))
+    return rank_completions(results, prefix)
+
+# Bumped when preloaded files are parsed differently, older indexes are ignored
+PRELOAD_PARSER_VERSION = 2
+
+def preload_index_path(folder):
+    # One index per preload folder in the cache directory of Sublime
+    name = "%s.v%d.index" % (hashlib.sha1(folder.encode('utf-8')).hexdigest(), PRELOAD_PARSER_VERSION)
+    return join(sublime.cache_path(), "autocomplete", name)
+
+# Suggestions of preloaded files are stored under this prefix plus the path
+PRELOAD_KEY_PREFIX = 'preload:'
+PRELOAD_NAME = re.compile(r'[a-z_A-Z0-9]')
+# Files parsed between two progress reports
+PRELOAD_BATCH_SIZE = 200
+# Seconds the preload thread sleeps between batches to leave the GIL to Sublime
+PRELOAD_BATCH_PAUSE = 0.05
+# Imports are looked for in the beginning of the open views
+IMPORTS_SCAN_SIZE = 20000
+
+def folder_entries(folder):
+    # (name, path, is_dir, stat) of the entries of folder, stat() gives the
+    # os.stat result of a file. scandir caches it on Windows.
+    if hasattr(os, 'scandir'):
+        for entry in os.scandir(folder):
+            yield (entry.name, entry.path, entry.is_dir(), entry.stat)
+    else:
+        for name in listdir(folder):
+            path = join(folder, name)
+            yield (name, path, not isfile(path), lambda path=path: os.stat(path))
+
+def preload_files(folder):
+    # (path, os.stat result) of the files to preload in folder and its subfolders
     results = []
-    regex = re.compile("\\b((func\\s+[A-Za-z]+)|(init))\\(.*\\{")
-
-    for s in arr:
-        strips = s.strip()
-        cp = 0
-        while cp < len(s) and s[cp] == " ":
-            cp = cp + 1
-        # print(cp)
-        while len(stack) > 0 and cp == stack[len(stack) - 1] and strips == "}":
-            #print("pop " + str(stack[len(stack) - 1]))
-            stack.pop()
-        if len(stack) > 0 and cp >= stack[len(stack) - 1] + num_indentation * indentation:
-            #print("Ignore " + s)
-            continue
-        else:
-            results.append(s)
-            if regex.search(s) is not None:
-                # print("append " + str(cp) + " " + s)
-                stack.append(cp)
-    # print(str(len(arr)) + " " + str(len(results)))
-    return "\n".join(results)
-
-def preload_autocomplete(folder):
-    global suggestions
+    folders = [folder]
+    while len(folders) > 0:
+        current = folders.pop()
+        for (name, path, is_dir, stat) in folder_entries(current):
+            if not PRELOAD_NAME.match(name):
+                continue
+            if is_dir:
+                folders.append(path)
+            elif not name.endswith(".cached"):
+                # .cached files are left by older versions
+                results.append((path, stat()))
+    return results
+
+def preload_priority(relative_path, priority_names):
+    # 0 for the files of imported frameworks and the imported files, 1 for the rest
+    for part in relative_path.split(os.sep):
+        if part.split(".")[0] in priority_names:
+            return 0
+    return 1
+
+def report_preload_progress(message):
+    print(message)
+    sublime.status_message(message)
+
+def add_preloaded_suggestions(entries):
+    # Runs on the main thread like the other updates of suggestions. Types
+    # are indexed by the names in the index headers, their members are only
+    # read from the index when a lookup needs them.
+    def add():
+        for (key, value) in entries:
+            suggestions[key] = value
+            if METHOD_KEY in value or SUPERTYPE_KEY in value:
+                type_index.update(key, value.group(METHOD_KEY), value.group(SUPERTYPE_KEY))
+    sublime.set_timeout(add, 0)
+
+def preload_autocomplete(folder, priority_names=(), stopped=None):
+    # Loads the suggestions of the files in folder, the ones matching
+    # priority_names first. Every parsed file is appended to the index right
+    # away, so a preload interrupted through stopped resumes where it was.
     print("folder = ", folder)
-    if folder is not None:
-        folder = expanduser(folder)
-
-        onlyfolders = [f for f in listdir(folder) if not isfile(join(folder, f)) and re.match(r'[a-z_A-Z0-9]+', f)]
-        for subfolder in onlyfolders:
-            preload_autocomplete(join(folder, subfolder))
-
-        onlyfiles = [f for f in listdir(folder) if isfile(join(folder, f)) and re.match(r'[a-z_A-Z0-9]+(\.[a-z_A-Z0-9]+)*', f)]
-        cached_files = set([f for f in onlyfiles if f.endswith(".cached")])
-        onlyfiles = [f for f in onlyfiles if not f.endswith(".cached")]
-        current_id = 123456
-        start_time = time.time()
-        #print(onlyfiles)
-        for file in onlyfiles:
-            cached_file = file + ".cached"
-            if cached_file in cached_files:
-                actual_path = join(folder, cached_file)
-                thefile = open(actual_path, 'rb')
-                this_suggestions = pickle.load(thefile)
-                # print(cached_file," ", this_suggestions)
-                thefile.close()
-                suggestions[current_id] = this_suggestions
-                current_id = current_id + 1
-            else:
-                actual_path = join(folder, file)
-                with codecs.open(actual_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    this_suggestions = {
-                        PARAM_KEY: construct_func_objc(content),
-                    }
-
-                    cached_path = join(folder, cached_file)
-                    thefile = open(cached_path, 'wb')
-                    pickle.dump(this_suggestions, thefile)
-                    thefile.close()
-
-                    suggestions[current_id] = this_suggestions
-                    current_id = current_id + 1
-
-        #print("Init time = ", time.time() - start_time)
-    pass
-
-# sublime.set_timeout(lambda: preload_autocomplete(), 500)
-# wait_for_settings_and_do('autocomplete.sublime-settings', 'preload_swift', lambda folder: preload_autocomplete(folder))
-# wait_for_settings_and_do('autocomplete.sublime-settings', 'preload_objc', lambda folder: preload_autocomplete(folder))
-
-class ViewDeactivatedListener(sublime_plugin.EventListener):
-    def on_deactivated(self, view):
-        # print("============================== ", view.file_name())
-        global suggestions
-        start_time = time.time()
-        str = view.substr(sublime.Region(0, view.size()))
-        view_id = view.id()
-
-        sublime.set_timeout_async(lambda: self.parse_str_async(str,
-            lambda param_suggestions, method_suggestions, enum_suggestions: self.parse_completion(view_id, param_suggestions, method_suggestions, enum_suggestions)), 0)
-
-        # print(suggestions[view.id()])
-        # print("Sync string getting time = ", time.time() - start_time)
-
-    def parse_str_async(self, str, completion):
-        t = time.time()
-        str = comment_and_empty_line_remove(str)
-        method_suggestions = None
-        enum_suggestions = None
-        if len(str) >= 200000:
-            str = indentation_heuristic(str)
-            print("Heuristic time = ", time.time() - t)
+    if folder is None:
+        return
+    folder = expanduser(folder)
+    start_time = time.time()
+    index = PreloadIndex(preload_index_path(folder))
+    if not register_preload_index(index):
+        return
+
+    files = []
+    for (path, stat) in preload_files(folder):
+        relative_path = os.path.relpath(path, folder)
+        files.append((preload_priority(relative_path, priority_names), path, relative_path, stat))
+    files.sort(key=lambda file: file[:3])
+
+    indexed = []
+    outdated = []
+    for (priority, path, relative_path, stat) in files:
+        if index.is_valid(relative_path, stat.st_mtime_ns, stat.st_size):
+            indexed.append((PRELOAD_KEY_PREFIX + path, IndexedSuggestions(index, relative_path, compact_suggestions)))
         else:
-            method_suggestions = construct_links(str)
-            enum_suggestions = construct_enum_suggestions(str)
-        #print(suggestions, " ", view.id())
-        param_suggestions = construct_suggestions_swift(str)
-        # print("Total parse time = ", time.time() - t)
-        sublime.set_timeout(lambda: completion(param_suggestions, method_suggestions, enum_suggestions), 0)
-
-    def parse_completion(self, view_id, param_suggestions, method_suggestions, enum_suggestions):
-        suggestions[view_id] = { PARAM_KEY: param_suggestions }
-        if method_suggestions is not None:
-            suggestions[view_id][METHOD_KEY] = method_suggestions
-        if enum_suggestions is not None:
-            suggestions[view_id][ENUM_KEY] = enum_suggestions
+            outdated.append((path, relative_path, stat))
+    # Parsed suggestions are only read from the index when completion needs
+    # them. Added in batches so the main thread is never blocked long.
+    for batch_start in range(0, len(indexed), PRELOAD_BATCH_SIZE):
+        add_preloaded_suggestions(indexed[batch_start : batch_start + PRELOAD_BATCH_SIZE])
+
+    for batch_start in range(0, len(outdated), PRELOAD_BATCH_SIZE):
+        if stopped is not None and stopped.is_set():
+            print("Preload of ", folder, " stopped")
+            return
+        batch = outdated[batch_start : batch_start + PRELOAD_BATCH_SIZE]
+        parsed = worker_pool.map(construct_declarations_objc_from_file, [path for (path, relative_path, stat) in batch])
+        entries = []
+        for ((path, relative_path, stat), (param_suggestions, method_suggestions, supertypes)) in zip(batch, parsed):
+            file_suggestions = { PARAM_KEY: param_suggestions }
+            if len(method_suggestions) > 0:
+                file_suggestions[METHOD_KEY] = method_suggestions
+            if len(supertypes) > 0:
+                file_suggestions[SUPERTYPE_KEY] = supertypes
+            if not index.add(relative_path, stat.st_mtime_ns, stat.st_size, file_suggestions):
+                print("Preload of ", folder, " stopped")
+                return
+            entries.append((PRELOAD_KEY_PREFIX + path, IndexedSuggestions(index, relative_path, compact_suggestions)))
+        add_preloaded_suggestions(entries)
+        report_preload_progress("Preload: parsed %d of %d files in %s" % (batch_start + len(batch), len(outdated), folder))
+        time.sleep(PRELOAD_BATCH_PAUSE)
+
+    # Forget deleted files
+    index.retain(set(relative_path for (priority, path, relative_path, stat) in files))
+    report_preload_progress("Preload: %d files (%d parsed) from %s in %.2fs" % (len(files), len(outdated), folder, time.time() - start_time))
+
+preload_stopped = threading.Event()
+# Indexes written by the preload threads, shut down when the plugin is
+# unloaded. A reloaded plugin appends to the same files from new threads.
+preload_indexes = []
+preload_lock = threading.Lock()
+
+def register_preload_index(index):
+    # False if the plugin was unloaded, the index must not be written then
+    with preload_lock:
+        if preload_stopped.is_set():
+            index.shutdown()
+            return False
+        preload_indexes.append(index)
+        return True
+
+def open_views_imports():
+    names = set()
+    for window in sublime.windows():
+        for view in window.views():
+            names.update(imported_names(view.substr(sublime.Region(0, min(view.size(), IMPORTS_SCAN_SIZE)))))
+    return names
+
+def start_preload(folder):
+    if preload_stopped.is_set():
+        return
+    priority_names = open_views_imports()
+
+    def run():
+        try:
+            preload_autocomplete(folder, priority_names, preload_stopped)
+        except Exception as e:
+            print("Preload of ", folder, " failed: ", e)
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+def plugin_loaded():
+    wait_for_settings_and_do(SETTINGS_FILE, 'preload_swift', start_preload)
+    wait_for_settings_and_do(SETTINGS_FILE, 'preload_objc', start_preload)
+
+def plugin_unloaded():
+    # The preload threads stop at their next batch, their indexes stop
+    # writing right away
+    with preload_lock:
+        preload_stopped.set()
+        for index in preload_indexes:
+            index.shutdown()
+        del preload_indexes[:]
+
+class ViewDeactivatedListener(base_listener.BaseViewDeactivatedListener):
+    get_suggestions = staticmethod(construct_declarations_swift)
+    # Long type bodies are split between members, editing a method of a big
+    # class only parses the members around it again
+    split_blocks = staticmethod(split_swift_blocks)
+
+    def __init__(self):
+        super().__init__()
+        # Symbols of the units of the text as is, so positions match the view
+        self.symbol_parser = IncrementalParser(symbol_declarations, split_swift_symbol_blocks)
+
+    def parse_str(self, view_id, str, max_parse_size):
+        with metrics.timer('symbol_table'):
+            # Only the declarations edited since the last parse are scanned again
+            symbol_table = merge_symbol_declarations(self.symbol_parser.parse_units(view_id, str, worker_pool.map))
+        with metrics.timer('comment_strip'):
+            str = comment_and_empty_line_remove(str)
+        if len(str) >= max_parse_size:
+            # Only the declarations are parsed, function bodies are dropped
+            with metrics.timer('strip_function_bodies'):
+                str = strip_function_bodies(str)
+        with metrics.timer('parse.' + type(self).__name__):
+            # Only the declarations edited since the last parse are parsed again
+            blocks = self.incremental_parser.parse(view_id, str, worker_pool.map)
+            (param_suggestions, method_suggestions, enum_suggestions, supertypes) = merge_declarations(blocks)
+        with metrics.timer('compact.' + type(self).__name__):
+            view_suggestions = {
+                PARAM_KEY: PairList(param_suggestions),
+                METHOD_KEY: GroupTable(method_suggestions),
+                ENUM_KEY: GroupTable(enum_suggestions),
+                SUPERTYPE_KEY: GroupTable(supertypes)
+            }
+        return (view_suggestions, symbol_table)
+
+    def store_suggestions(self, view_id, parsed):
+        (view_suggestions, symbol_table) = parsed
+        suggestions[view_id] = view_suggestions
+        index_types(view_id, view_suggestions)
+        symbol_tables[view_id] = symbol_table
+        return sum(len(table) for table in view_suggestions.values())
+
+    def forget_view(self, view_id):
+        super().forget_view(view_id)
+        self.symbol_parser.forget(view_id)
+
+    def forget_suggestions(self, view_id):
+        # Preloaded suggestions are stored under string keys and never dropped
+        suggestions.pop(view_id, None)
+        symbol_tables.pop(view_id, None)
+        type_index.remove(view_id)
+
+    def suggestion_storage(self):
+        return suggestions
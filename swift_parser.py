@@ -0,0 +1,574 @@
+# Swift parsing. Doesn't import sublime so it can run in parse worker processes.
+
+from .text_processing import *
+from .common.metrics import metrics
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+# Snippets are memoized, the same signatures show up again and again across
+# files and their suggestions then share one snippet string
+SNIPPET_CACHE_SIZE = 4096
+
+PARAM_PATTERN = re.compile(r'\s*(\w+\s+)*(\w+)\s*:')
+
+def sublime_params_snippet_from_str(params_str, is_func):
+    if params_str.isspace() or params_str == "":
+        return "()"
+    parts = []
+    current_index = 0
+    for param in params_str.split(","):
+        current_index = current_index + 1
+        match = PARAM_PATTERN.match(param)
+        if match is None:
+            parts.append("$%d" % current_index)
+            continue
+        param_var = match.group(2)
+        param_name = match.group(1).strip() if match.group(1) is not None else param_var
+        if len(parts) == 0 and is_func:
+            parts.append("${%d:%s}$%d" % (current_index, param_var, current_index + 1))
+            current_index = current_index + 1
+        else:
+            parts.append("%s: ${%d:%s}" % (param_name, current_index, param_var))
+    return "(" + ", ".join(parts) + ")"
+
+@lru_cache(maxsize=SNIPPET_CACHE_SIZE)
+def call_snippet(params_str, is_func):
+    # Snippet for the parameters between the parentheses of a declaration,
+    # None if there are none
+    snippet = sublime_params_snippet_from_str(params_str[1:-1], is_func)
+    if snippet == "()":
+        return None
+    return snippet[1:-1]
+
+@lru_cache(maxsize=SNIPPET_CACHE_SIZE)
+def struct_init_snippet(param_names):
+    return ", ".join("%s: ${%d}" % (name, index) for (index, name) in enumerate(param_names, 1))
+
+# Everything construct_declarations_swift looks at, found in one pass.
+# Comments and string literals are matched to be skipped, braces to know
+# which type body the declarations are members of.
+DECLARATION_TOKENS = re.compile(r'''
+    (?=[/"\#{}cefilpsv])
+    (?:(?P<line_comment>//[^\n]*)
+    |(?P<block_comment>/\*)
+    |(?P<string>\#*"(?:"")?)
+    |(?P<open>\{)
+    |(?P<close>\})
+    |(?<![.\w])(?:(?P<type>class|struct|enum|protocol|extension)
+        |(?P<function>func)
+        |(?P<init>init)
+        |(?P<variable>var|let)
+        |(?P<case>case))\b)
+    ''', re.X)
+# class Foo<T>: Bar, Baz where T: Qux {, the body brace included
+TYPE_HEADER = re.compile(r'[ \t\n]+(\w+)([^{}]*)\{')
+# class func, class var... are not types
+TYPE_MODIFIED = frozenset(["func", "var", "let", "subscript", "init", "static",
+    "final", "override", "open", "public", "private", "fileprivate", "internal"])
+SUPERTYPES_CLAUSE = re.compile(r'(?:<[^>{]*>)?[ \t]*:([^{]*)')
+TYPE_NAME = re.compile(r'[A-Za-z_]\w*\Z')
+MEMBER_NAME = re.compile(r'[ \t\n]+(\w+)')
+PARAMETERS = re.compile(r'[ \t\n]*\(')
+CASE_NAME = re.compile(r'[ \t\n]*(\w+)')
+# = raw value, up to the next case of the list
+CASE_VALUE = re.compile(r'[^,\n;{}()"]*')
+# var x: Int {, no initializer before the brace
+COMPUTED_PROPERTY = re.compile(r'[^\n{}"/=]*\{')
+
+def supertype_names(header):
+    # Superclass and protocols in the part of a type declaration between the
+    # name and the body
+    names = []
+    match = SUPERTYPES_CLAUSE.match(header)
+    if match is not None:
+        for supertype in re.split(r'\bwhere\b', match.group(1))[0].split(","):
+            # Swift.Equatable, Array<Int>
+            supertype = supertype.split("<")[0].strip().split(".")[-1]
+            # protocol P: class {
+            if TYPE_NAME.match(supertype) and supertype != "class":
+                names.append(supertype)
+    return names
+
+def scan_declarations_swift(str):
+    # (params, struct fields, members, enum cases, supertypes) of str:
+    # [(function or class, snippet)], {struct: [stored property]},
+    # {type: [func, var or let]}, {enum: [case]}, {type: [supertype]}
+    params = []
+    fields = {}
+    members = {}
+    cases = {}
+    supertypes = {}
+    # (keyword, name) of every open brace, None for the ones not opening a
+    # type body
+    stack = [None]
+    position = 0
+    while True:
+        match = DECLARATION_TOKENS.search(str, position)
+        if match is None:
+            break
+        position = match.end()
+        kind = match.lastgroup
+        frame = stack[-1]
+        if kind == 'line_comment':
+            pass
+        elif kind == 'block_comment':
+            position = skip_block_comment(str, position)
+        elif kind == 'string':
+            position = skip_string(str, position, match.group(0))
+        elif kind == 'open':
+            stack.append(None)
+        elif kind == 'close':
+            if len(stack) > 1:
+                stack.pop()
+        elif kind == 'type':
+            header = TYPE_HEADER.match(str, position)
+            if header is not None and header.group(1) not in TYPE_MODIFIED:
+                (keyword, name) = (match.group(kind), header.group(1))
+                names = supertype_names(header.group(2))
+                if len(names) > 0:
+                    supertypes.setdefault(name, []).extend(names)
+                stack.append((keyword, name))
+                position = header.end()
+        elif kind == 'function':
+            name = MEMBER_NAME.match(str, position)
+            if name is not None:
+                position = name.end()
+                if frame is not None and frame[0] != "enum":
+                    members.setdefault(frame[1], []).append(name.group(1))
+                # Functions nested in bodies are suggested too
+                parameters = PARAMETERS.match(str, position)
+                if parameters is not None:
+                    end = skip_parentheses(str, parameters.end())
+                    if str[end - 1 : end] == ")":
+                        snippet = call_snippet(str[parameters.end() - 1 : end], name.group(1)[0:1].islower())
+                        if snippet is not None:
+                            params.append((name.group(1), snippet))
+                    position = end
+        elif frame is None:
+            pass
+        elif kind == 'init':
+            parameters = PARAMETERS.match(str, position)
+            if frame[0] == "class" and parameters is not None:
+                end = skip_parentheses(str, parameters.end())
+                if str[end - 1 : end] == ")":
+                    snippet = call_snippet(str[parameters.end() - 1 : end], frame[1][0:1].islower())
+                    if snippet is not None:
+                        params.append((frame[1], snippet))
+                position = end
+        elif kind == 'variable':
+            name = MEMBER_NAME.match(str, position)
+            if name is not None and frame[0] != "enum":
+                position = name.end()
+                members.setdefault(frame[1], []).append(name.group(1))
+                # Stored properties are the parameters of the memberwise
+                # initializer
+                line = str[str.rfind("\n", 0, match.start()) + 1 : match.start()]
+                if (frame[0] == "struct" and "static" not in line and
+                        COMPUTED_PROPERTY.match(str, position) is None):
+                    fields.setdefault(frame[1], []).append(name.group(1))
+        elif kind == 'case' and frame[0] == "enum":
+            # case a, b(Int), c = 3
+            while True:
+                name = CASE_NAME.match(str, position)
+                if name is None:
+                    break
+                cases.setdefault(frame[1], []).append(name.group(1))
+                position = name.end()
+                if str.startswith("(", position):
+                    position = skip_parentheses(str, position + 1)
+                position = CASE_VALUE.match(str, position).end()
+                if not str.startswith(",", position):
+                    break
+                position = position + 1
+    return (params, fields, members, cases, supertypes)
+
+def construct_declarations_swift(str):
+    # Parse result of a unit, see merge_declarations
+    with metrics.timer('scan.declarations'):
+        return scan_declarations_swift(str)
+
+def merge_declarations(declarations):
+    # Combines construct_declarations_swift results of consecutive blocks
+    # into (param suggestions, method suggestions, enum suggestions,
+    # supertypes). Struct initializers are made once the stored properties
+    # of every block are known.
+    param_suggestions = []
+    struct_fields = {}
+    method_suggestions = {}
+    enum_suggestions = {}
+    supertypes = {}
+    for (params, fields, methods, enums, block_supertypes) in declarations:
+        param_suggestions.extend(params)
+        for merged, groups in ((struct_fields, fields), (method_suggestions, methods),
+                (enum_suggestions, enums), (supertypes, block_supertypes)):
+            for name, members in groups.items():
+                if name in merged:
+                    merged[name].extend(members)
+                else:
+                    merged[name] = list(members)
+    for name in sorted(struct_fields.keys()):
+        param_suggestions.append((name, struct_init_snippet(tuple(struct_fields[name]))))
+    return (param_suggestions, method_suggestions, enum_suggestions, supertypes)
+
+def construct_suggestions_swift(str):
+    return merge_declarations([construct_declarations_swift(str)])[0]
+
+def construct_links(str):
+    return merge_declarations([construct_declarations_swift(str)])[1]
+
+def construct_enum_suggestions(str):
+    return merge_declarations([construct_declarations_swift(str)])[2]
+
+def construct_supertypes(str):
+    # {type: [superclass and protocols]}
+    return merge_declarations([construct_declarations_swift(str)])[3]
+
+# Declaration-only view of a Swift file, for files too big to parse as a
+# whole. Bodies of functions, initializers, subscripts and of properties with
+# braces on their first line are replaced with {}, so locals and statements
+# are not scanned. Type bodies are kept. Comments are dropped and string
+# literals, multi-line and raw ones included, are replaced with "" so their
+# braces don't count.
+BODY_TOKENS = re.compile(r'''
+    (?=[/"\#{}()a-z])
+    (?:(?P<line_comment>//[^\n]*)
+    |(?P<block_comment>/\*)
+    |(?P<string>\#*"(?:"")?)
+    |(?P<open>\{)
+    |(?P<close>\})
+    |(?P<open_paren>\()
+    |(?P<close_paren>\))
+    |(?<![.\w])(?P<function>func|init|deinit|subscript)\b
+    |(?<![.\w])(?P<variable>var|let)\b
+    |(?<![.\w])(?P<declaration>case|typealias|class|struct|enum|extension|protocol|import)\b)
+    ''', re.X)
+# let x = { ... }, var x: Int { ... }, the brace is on the same line
+VARIABLE_BODY = re.compile(r'[^\n{}"/]*\{')
+# The lookaheads let the regex engine skip to candidate characters quickly
+BRACE_TOKENS = re.compile(r'(?=[{}"/#])(?://[^\n]*|/\*|#*"(?:"")?|[{}])')
+BLOCK_COMMENT_TOKENS = re.compile(r'/\*|\*/')
+INTERPOLATION_TOKENS = re.compile(r'(?=[()"#])(?:[()]|#*"(?:"")?)')
+STRING_TOKENS = re.compile(r'\\\(|\\.|"|\n')
+MULTILINE_STRING_TOKENS = re.compile(r'\\\(|\\.|"""', re.S)
+
+def skip_block_comment(str, position):
+    # position is after the opening /*, comments nest
+    depth = 1
+    for match in BLOCK_COMMENT_TOKENS.finditer(str, position):
+        depth = depth + (1 if match.group(0) == "/*" else -1)
+        if depth == 0:
+            return match.end()
+    return len(str)
+
+def skip_string(str, position, delimiter):
+    # position is after the opening delimiter, one of ", """, #", #"""...
+    hashes = delimiter.count("#")
+    multiline = delimiter.endswith('"""')
+    if hashes > 0:
+        # raw strings have no escapes
+        end = str.find(delimiter[hashes:] + "#" * hashes, position)
+        line_end = str.find("\n", position)
+        if end == -1 or (not multiline and line_end != -1 and line_end < end):
+            return len(str) if multiline or line_end == -1 else line_end
+        return end + len(delimiter)
+    tokens = MULTILINE_STRING_TOKENS if multiline else STRING_TOKENS
+    while True:
+        match = tokens.search(str, position)
+        if match is None:
+            return len(str)
+        token = match.group(0)
+        if token == "\\(":
+            position = skip_parentheses(str, match.end())
+        elif token == "\n":
+            # unterminated
+            return match.start()
+        elif token[0] == '"':
+            return match.end()
+        else:
+            position = match.end()
+
+def skip_parentheses(str, position):
+    # position is after the opening parenthesis, or the \( of an
+    # interpolation
+    depth = 1
+    while True:
+        match = INTERPOLATION_TOKENS.search(str, position)
+        if match is None:
+            return len(str)
+        token = match.group(0)
+        if token == "(":
+            depth = depth + 1
+        elif token == ")":
+            depth = depth - 1
+            if depth == 0:
+                return match.end()
+        else:
+            position = skip_string(str, match.end(), token)
+            continue
+        position = match.end()
+
+def skip_body(str, position):
+    # position is after the opening brace, returns the position after the
+    # matching closing one
+    depth = 1
+    while True:
+        match = BRACE_TOKENS.search(str, position)
+        if match is None:
+            return len(str)
+        token = match.group(0)
+        position = match.end()
+        if token == "{":
+            depth = depth + 1
+        elif token == "}":
+            depth = depth - 1
+            if depth == 0:
+                return position
+        elif token == "/*":
+            position = skip_block_comment(str, position)
+        elif token[-1] == '"':
+            position = skip_string(str, position, token)
+
+def strip_function_bodies(str):
+    pieces = []
+    copied = 0
+    position = 0
+    depth = 0
+    # depth of the declaration waiting for its body, and the parentheses
+    # opened since it started, so closures in default arguments are kept
+    pending = None
+    parentheses = 0
+    while True:
+        match = BODY_TOKENS.search(str, position)
+        if match is None:
+            break
+        position = match.end()
+        kind = match.lastgroup
+        if kind == 'line_comment':
+            pieces.append(str[copied:match.start()])
+            copied = position
+        elif kind == 'block_comment':
+            pieces.append(str[copied:match.start()])
+            pieces.append(" ")
+            position = copied = skip_block_comment(str, position)
+        elif kind == 'string':
+            pieces.append(str[copied:match.start()])
+            pieces.append('""')
+            position = copied = skip_string(str, position, match.group(0))
+        elif kind == 'open':
+            if pending == depth and parentheses == 0:
+                pieces.append(str[copied:position])
+                pieces.append("}")
+                position = copied = skip_body(str, position)
+                pending = None
+            else:
+                depth = depth + 1
+        elif kind == 'close':
+            depth = max(depth - 1, 0)
+            if pending is not None and pending > depth:
+                pending = None
+        elif kind == 'open_paren':
+            parentheses = parentheses + 1
+        elif kind == 'close_paren':
+            parentheses = max(parentheses - 1, 0)
+        elif kind == 'function':
+            pending = depth
+            parentheses = 0
+        elif kind == 'variable':
+            if VARIABLE_BODY.match(str, position) is not None:
+                pending = depth
+                parentheses = 0
+            elif pending == depth:
+                pending = None
+        elif pending == depth:
+            pending = None
+    pieces.append(str[copied:])
+    return "".join(pieces)
+
+# Top-level type bodies longer than this are split between their members
+TYPE_SPLIT_SIZE = 8192
+TYPE_KEYWORD = re.compile(r'(?<![.\w])(?:class|struct|enum|protocol|extension)\b')
+
+def type_body_header(str, start, brace):
+    # "keyword Name {" if the brace at offset brace opens the body of a type
+    # declared after start, None otherwise
+    for keyword in TYPE_KEYWORD.finditer(str, start, brace):
+        header = TYPE_HEADER.match(str, keyword.end())
+        if header is not None and header.end() == brace + 1 and header.group(1) not in TYPE_MODIFIED:
+            return "%s %s {" % (keyword.group(0), header.group(1))
+    return None
+
+def split_swift_blocks(str):
+    # Split function of IncrementalParser. Top-level blocks, like
+    # split_top_level_blocks but braces of comments and strings don't count.
+    # A long type body is cut after every member ending with a brace, the
+    # pieces after the first one have "keyword Name {" of the type as header
+    # so their members are still attributed to it.
+    blocks = []
+    start = 0
+    position = 0
+    depth = 0
+    # header of the top-level type body being read, where it starts and the
+    # ends of its members
+    header = None
+    body_start = 0
+    cuts = []
+
+    def add_blocks(end):
+        if header is not None and end - body_start >= TYPE_SPLIT_SIZE:
+            previous = start
+            for cut in cuts:
+                blocks.append(("" if previous == start else header, str[previous:cut]))
+                previous = cut
+            blocks.append(("" if previous == start else header, str[previous:end]))
+        else:
+            blocks.append(("", str[start:end]))
+
+    while True:
+        match = BRACE_TOKENS.search(str, position)
+        if match is None:
+            break
+        token = match.group(0)
+        position = match.end()
+        if token == "{":
+            if depth == 0:
+                header = type_body_header(str, start, match.start())
+                body_start = position
+                cuts = []
+            depth = depth + 1
+        elif token == "}":
+            if depth == 0:
+                continue
+            depth = depth - 1
+            if depth == 1:
+                cuts.append(position)
+            elif depth == 0:
+                add_blocks(position)
+                start = position
+                header = None
+        elif token == "/*":
+            position = skip_block_comment(str, position)
+        elif token[-1] == '"':
+            position = skip_string(str, position, token)
+    if start < len(str):
+        # whatever follows the last block, or an unterminated one
+        add_blocks(len(str))
+    return blocks
+
+# import UIKit, import class Foo.Bar, @import Foo; and #import <Foo/Bar.h>
+IMPORT_PATTERN = re.compile(r'^[ \t]*(?:@import|import|#import|#include)[ \t]+(?:(?:class|struct|enum|protocol|func|var|let|typealias)[ \t]+)?[<"]?([\w./]+)', re.M)
+
+def imported_names(str):
+    # Module and file names, without extension, imported by str
+    names = set()
+    for path in IMPORT_PATTERN.findall(str):
+        for part in path.split("/"):
+            names.add(part.split(".")[0])
+    return names
+
+# Braces, and let/var declarations with a type annotation or a Type(...)
+# initializer. Comments and string literals are matched to be skipped.
+SYMBOL_TOKENS = re.compile(r'''
+    (?=[/"{}lv])
+    (?:(?P<skip>//[^\n]*|/\*.*?\*/|"(?:[^"\\\n]|\\.)*")
+    |(?P<open>\{)
+    |(?P<close>\})
+    |\b(?:let|var)[ \t]+(?P<name>\w+)[ \t]*
+        (?::[ \t]*(?P<annotation>[A-Z]\w*)|=[ \t]*(?P<initializer>[A-Z]\w*)[ \t]*\())
+    ''', re.S | re.X)
+
+class SymbolTable:
+    # Variables declared in a Swift file, with the type they were declared
+    # with and the range of the text where they are visible: from the
+    # declaration to the end of the enclosing braces.
+    def __init__(self, declarations):
+        # name -> (starts, [(start, scope end, type)]), sorted by start
+        self.names = {}
+        for (name, start, end, type) in sorted(declarations, key=lambda declaration: declaration[1]):
+            (starts, entries) = self.names.setdefault(name, ([], []))
+            starts.append(start)
+            entries.append((start, end, type))
+
+    def __len__(self):
+        return sum(len(starts) for (starts, entries) in self.names.values())
+
+    def type_at(self, name, position, is_current=None):
+        # Type of the innermost declaration of name visible at position, None
+        # if there is none. is_current(start) can reject declarations that
+        # are not at start anymore, since the text was edited.
+        if name not in self.names:
+            return None
+        (starts, entries) = self.names[name]
+        index = bisect_left(starts, position) - 1
+        while index >= 0:
+            (start, end, type) = entries[index]
+            if position < end and (is_current is None or is_current(start)):
+                return type
+            index = index - 1
+        return None
+
+def symbol_declarations(str):
+    # (declarations, closes, pending) of the variables declared in str, which
+    # can be a block of a bigger text starting or ending inside of braces.
+    # declarations are (name, start, scope end, type) of the ones whose
+    # scope ends in str. closes are the offsets of the braces closing ones
+    # opened before str. pending has, for the braces still open at the end of
+    # str from the outermost one, the (name, start, type) of the ones
+    # declared there.
+    declarations = []
+    closes = []
+    stack = [[]]
+    for match in SYMBOL_TOKENS.finditer(str):
+        if match.group('skip') is not None:
+            continue
+        if match.group('open') is not None:
+            stack.append([])
+        elif match.group('close') is not None:
+            for (name, start, type) in stack.pop():
+                declarations.append((name, start, match.start(), type))
+            if len(stack) == 0:
+                closes.append(match.start())
+                stack.append([])
+        else:
+            type = match.group('annotation') or match.group('initializer')
+            stack[-1].append((match.group('name'), match.start('name'), type))
+    return (declarations, closes, stack)
+
+def merge_symbol_declarations(blocks):
+    # SymbolTable of consecutive (block, symbol_declarations(block)) pairs,
+    # positions are offsets in the blocks joined
+    blocks = list(blocks)
+    length = sum(len(block) for (block, block_declarations) in blocks)
+    declarations = []
+    # declarations of the blocks before waiting for the end of their scope,
+    # per open brace
+    stack = [[]]
+    offset = 0
+    for (block, (block_declarations, closes, pending)) in blocks:
+        for (name, start, end, type) in block_declarations:
+            declarations.append((name, offset + start, offset + end, type))
+        for close in closes:
+            if len(stack) > 1:
+                for (name, start, type) in stack.pop():
+                    declarations.append((name, start, offset + close, type))
+        for (depth, names) in enumerate(pending):
+            names = [(name, offset + start, type) for (name, start, type) in names]
+            if depth == 0:
+                stack[-1].extend(names)
+            else:
+                stack.append(names)
+        offset = offset + len(block)
+    for names in stack:
+        for (name, start, type) in names:
+            declarations.append((name, start, length, type))
+    return SymbolTable(declarations)
+
+def split_swift_symbol_blocks(str):
+    # Blocks of split_swift_blocks without their headers, symbol positions
+    # are offsets in str
+    return [("", block) for (header, block) in split_swift_blocks(str)]
+
+def construct_symbol_table(str):
+    # str is the whole text of the view, positions are offsets in it
+    return merge_symbol_declarations([(str, symbol_declarations(str))])
@@ -0,0 +1,78 @@
+# Members of Swift and ObjC types merged across files. Doesn't import sublime.
+
+class TypeIndex:
+    # Members of every type, merged over all the views and preloaded files
+    # declaring or extending it, with the members inherited from its
+    # superclass and protocols. Sources are view ids or preload keys, each
+    # one gives {type: [member]} and {type: [supertype]} tables. Only used
+    # from the main thread.
+    def __init__(self):
+        self.sources = {}
+        # type -> {source: members table of the source}
+        self.member_tables = {}
+        # type -> {source: supertypes table of the source}
+        self.supertype_tables = {}
+        # type -> all its members, computed on first use after a change
+        self.resolved = {}
+
+    def update(self, source, members, supertypes):
+        self.remove(source)
+        members = members if members is not None else {}
+        supertypes = supertypes if supertypes is not None else {}
+        if len(members) == 0 and len(supertypes) == 0:
+            return
+        self.sources[source] = (members, supertypes)
+        for (tables, table) in ((self.member_tables, members), (self.supertype_tables, supertypes)):
+            for type in table.keys():
+                tables.setdefault(type, {})[source] = table
+        self.resolved = {}
+
+    def remove(self, source):
+        old = self.sources.pop(source, None)
+        if old is None:
+            return
+        for (tables, table) in zip((self.member_tables, self.supertype_tables), old):
+            for type in table.keys():
+                tables[type].pop(source, None)
+                if len(tables[type]) == 0:
+                    del tables[type]
+        self.resolved = {}
+
+    def members(self, type):
+        # Own members first, then the inherited ones, without duplicates
+        results = self.resolved.get(type)
+        if results is None:
+            results = self.resolve(type, set())
+            self.resolved[type] = results
+        return results
+
+    def supertypes(self, type):
+        results = []
+        for table in self.supertype_tables.get(type, {}).values():
+            for supertype in table[type]:
+                if supertype not in results:
+                    results.append(supertype)
+        return results
+
+    def resolve(self, type, visiting):
+        visiting.add(type)
+        results = []
+        seen = set()
+        for table in self.member_tables.get(type, {}).values():
+            for member in table[type]:
+                if member not in seen:
+                    seen.add(member)
+                    results.append(member)
+        for supertype in self.supertypes(type):
+            # class A: B where B extends A is invalid but may be half typed
+            if supertype in visiting:
+                continue
+            inherited = self.resolved.get(supertype)
+            if inherited is None:
+                inherited = self.resolve(supertype, visiting)
+            for member in inherited:
+                if member not in seen:
+                    seen.add(member)
+                    results.append(member)
+        visiting.discard(type)
+        return tuple(results)
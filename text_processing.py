@@ -1,3 +1,6 @@
+import re
+import threading
+from array import array
 
 class Segment:
     def __init__(self, start, end):
@@ -48,10 +51,7 @@ class BackwardExpectation(ExpectationBase):
 class BeginOfLineExpectation(ExpectationBase):
     # Move back to the beginning of a line or the entire string
     def scan(self, str, segment):
-        i = segment.start - 1
-        while i >= 0 and str[i] != '\n':
-            i = i - 1
-        return Segment(segment.start, i + 1)
+        return Segment(segment.start, str.rfind('\n', 0, segment.start) + 1)
 
 class OrExpectation(ExpectationBase):
     def __init__(self, exp1, exp2):
@@ -82,42 +82,43 @@ class StringMatchExpectation(ExpectationBase):
         self.match = match
 
     def scan(self, str, segment):
+        # The match has to start before segment.end but may run past it
         word_len = len(self.match)
-        for i in range(segment.start, segment.end):
-            if i + word_len <= len(str):
-                if str[i : i + word_len] == self.match:
-                    return Segment(i, i + word_len)
+        i = str.find(self.match, segment.start, segment.end + word_len - 1)
+        if i == -1:
+            return Segment.notFound(segment.end)
+        return Segment(i, i + word_len)
 
-        return Segment.notFound(segment.end)
+def compile_alternation(matches):
+    # One regex for all the words. At a given position the regex engine tries
+    # the alternatives in order, so the word listed first wins ties.
+    return re.compile("|".join(re.escape(word) for word in matches))
 
 class OneOfStringsMatchExpectation(ExpectationBase):
     # Same as StringMatchExpectation but for an array of matches
     def __init__(self, matches):
         self.matches = matches
+        self.pattern = compile_alternation(matches)
+        self.max_len = max([len(word) for word in matches] + [0])
 
     def scan(self, str, segment):
-        for i in range(segment.start, segment.end):
-            for word in self.matches:
-                word_len = len(word)
-                if i + word_len <= len(str):
-                    if str[i : i + word_len] == word:
-                        return Segment(i, i + word_len)
-
-        return Segment.notFound(segment.end)
+        # Any match starting before segment.end fits in this window
+        match = self.pattern.search(str, segment.start, segment.end + self.max_len - 1)
+        if match is None or match.start() >= segment.end:
+            return Segment.notFound(segment.end)
+        return Segment(match.start(), match.end())
 
 class OneOfStringsMatchReturnBeginningIfFailsExpectation(ExpectationBase):
     # Same as OneOfStringsMatchExpectation. If fails, keep the search at the beginning of a segment
     def __init__(self, matches):
         self.matches = matches
+        self.pattern = compile_alternation(matches)
 
     def scan(self, str, segment):
-        for i in range(segment.start, segment.end):
-            for word in self.matches:
-                word_len = len(word)
-                if i + word_len <= len(str):
-                    if str[i : i + word_len] == word:
-                        return Segment(i, i + word_len)
-            break
+        if segment.start < segment.end:
+            match = self.pattern.match(str, segment.start)
+            if match is not None:
+                return Segment(match.start(), match.end())
 
         return Segment.notFound(segment.start)
 
@@ -125,18 +126,19 @@ class OneOfStringsMatchAtBeginningExpectation(ExpectationBase):
     # Same as OneOfStringsMatchExpectation but matching must happen at the first char
     def __init__(self, matches):
         self.matches = matches
+        self.pattern = compile_alternation(matches)
 
     def scan(self, str, segment):
-        i = segment.start
-        for word in self.matches:
-            word_len = len(word)
-            if i + word_len <= len(str):
-                if str[i : i + word_len] == word:
-                    return Segment(i, i + word_len)
+        match = self.pattern.match(str, segment.start)
+        if match is not None:
+            return Segment(match.start(), match.end())
 
         return Segment.notFound(segment.start)
 
 class ConditionExpectationBase(ExpectationBase):
+    # Subclasses can set pattern to a compiled regex that matches the same run
+    # of characters as condition, so the scan happens in the regex engine
+    pattern = None
 
     def canEmpty(self):
         return True
@@ -146,26 +148,36 @@ class ConditionExpectationBase(ExpectationBase):
 
     def scan(self, str, segment):
         start = segment.start
-        i = start
-        while i < len(str):
-            if not self.condition(str[i]):
-                break
-            i = i + 1
+        if self.pattern is not None:
+            i = self.pattern.match(str, start).end() if start < len(str) else start
+        else:
+            i = start
+            while i < len(str):
+                if not self.condition(str[i]):
+                    break
+                i = i + 1
         if not self.canEmpty() and i == start:
             return Segment.notFound(start)
         return Segment(start, i)
 
+_WORD_CHARS = re.compile(r'\w*')
+_SPACES = re.compile(r'[ \t\n]*')
+_BLANKS = re.compile(r' *')
+
 class WordExpectation(ConditionExpectationBase):
+    pattern = _WORD_CHARS
     def canEmpty(self):
         return False
     def condition(self, c):
         return c.isalnum() or c == "_"
 
 class SpacesExpectation(ConditionExpectationBase):
+    pattern = _SPACES
     def condition(self, c):
         return c == " " or c == "\t" or c == "\n"
 
 class AtLeastOneSpacesExpectation(ConditionExpectationBase):
+    pattern = _SPACES
     def canEmpty(self):
         return False
     def condition(self, c):
@@ -174,6 +186,8 @@ class AtLeastOneSpacesExpectation(ConditionExpectationBase):
 class GrabUntilExpectation(ConditionExpectationBase):
     def __init__(self, blacklist):
         self.blacklist = blacklist
+        chars = "".join(re.escape(b) for b in blacklist if len(b) == 1)
+        self.pattern = re.compile("[^" + chars + "]*" if chars else "(?s).*")
 
     def condition(self, c):
         for b in self.blacklist:
@@ -181,6 +195,65 @@ class GrabUntilExpectation(ConditionExpectationBase):
                 return False
         return True
 
+# Strings shorter than this are bracket-matched by counting, building an
+# index would cost more than it saves
+BRACKET_INDEX_MIN_SIZE = 256
+
+class BracketIndex:
+    # Pairs every openBracket of a document with its closeBracket in one pass.
+    # pairs[i] is the offset of the bracket closing the one at offset i, or -1
+    # if there is none.
+    def __init__(self, str, openBracket, closeBracket):
+        self.pairs = array('i', [-1]) * len(str)
+        stack = []
+        brackets = re.compile(re.escape(openBracket) + "|" + re.escape(closeBracket))
+        for match in brackets.finditer(str):
+            i = match.start()
+            if str[i] == openBracket:
+                stack.append(i)
+            elif len(stack) > 0:
+                self.pairs[stack.pop()] = i
+
+# Documents being scanned, as [str, {(open, close): BracketIndex}, scans].
+# The indexes are shared by every expectation and every concurrent scan of
+# the same document and dropped with the last scan, they never outlive the
+# parse.
+_document_scans = []
+_document_scans_lock = threading.Lock()
+
+def begin_document_scan(str):
+    with _document_scans_lock:
+        for entry in _document_scans:
+            if entry[0] is str:
+                entry[2] = entry[2] + 1
+                return entry
+        entry = [str, {}, 1]
+        _document_scans.append(entry)
+        return entry
+
+def end_document_scan(entry):
+    with _document_scans_lock:
+        entry[2] = entry[2] - 1
+        if entry[2] == 0:
+            _document_scans.remove(entry)
+
+def bracket_index(str, openBracket, closeBracket):
+    # Outside of a scan of str the index is built for this lookup only
+    key = (openBracket, closeBracket)
+    with _document_scans_lock:
+        indexes = None
+        for entry in _document_scans:
+            if entry[0] is str:
+                indexes = entry[1]
+                break
+        index = indexes.get(key) if indexes is not None else None
+    if index is None:
+        index = BracketIndex(str, openBracket, closeBracket)
+        if indexes is not None:
+            with _document_scans_lock:
+                index = indexes.setdefault(key, index)
+    return index
+
 class MatchBracketExpectation(ExpectationBase):
 
     def __init__(self, openBracket, closeBracket):
@@ -190,6 +263,11 @@ class MatchBracketExpectation(ExpectationBase):
     def scan(self, str, segment):
         if str[segment.start] != self.openBracket:
             return Segment.notFound(segment.start)
+        if len(str) >= BRACKET_INDEX_MIN_SIZE and self.openBracket != self.closeBracket:
+            close = bracket_index(str, self.openBracket, self.closeBracket).pairs[segment.start]
+            if close == -1:
+                return Segment.notFound(len(str))
+            return Segment(segment.start, close + 1)
         count = 1
         i = segment.start + 1
         while i < len(str):
@@ -208,11 +286,8 @@ class CapitalizedWordExpectation(ExpectationBase):
     def scan(self, str, segment):
         start = segment.start
         i = start
-        while i < len(str):
-            condition = (i == start and str[i].isupper()) or (i > start and (str[i].isalnum() or str[i] == "_"))
-            if not condition:
-                break
-            i = i + 1
+        if start < len(str) and str[start].isupper():
+            i = _WORD_CHARS.match(str, start + 1).end()
         if i == start:
             return Segment.notFound(start)
         return Segment(start, i)
@@ -220,67 +295,108 @@ class CapitalizedWordExpectation(ExpectationBase):
 class SpacePrefixedWordExpectation(ExpectationBase):
     def scan(self, str, segment):
         start = segment.start
-        i = start
-        while i < len(str) and str[i] == ' ':
-            i = i + 1
+        i = _BLANKS.match(str, start).end() if start < len(str) else start
         if i == len(str):
             return Segment.notFound(i)
         start = i
-        while i < len(str):
-            condition = str[i].isalnum() or str[i] == "_"
-            if not condition:
-                break
-            i = i + 1
+        i = _WORD_CHARS.match(str, start).end() if start < len(str) else start
         if i == start:
             return Segment.notFound(start)
         return Segment(start, i)
 
-def scan_text_recursive(str, segment, expectations, results, current_matches):
-    if len(expectations) == 0:
-        results.append(current_matches)
-        return segment.start
-    # print("recursive: ", segment.start, " ", segment.end, " ", expectations[0])
-
-    start = segment.start
-    end = segment.end
-    expectation = expectations[0]
-    is_looping = expectation.is_looping
-    is_nested = expectation.is_nested
-    is_save = expectation.is_save
-    while start < end:
-        res = expectation.scan(str, Segment(start, end))
-        if res.invalid():
-            if is_looping:
-                start = max(res.end, start + 1)
+def save_match(str, res, expectation, matches):
+    if res.start <= res.end and expectation.is_save:
+        if len(expectation.transform_expectations) > 0:
+            new_str = str[res.start : res.end]
+            return matches + (scan_text(new_str, expectation.transform_expectations),)
+        return matches + (str[res.start : res.end],)
+    return matches
+
+def scan_expectations(str, segment, expectations, matches):
+    # Generator yielding a tuple of saved matches every time all the
+    # expectations are satisfied. Walks the expectations with an explicit
+    # stack instead of recursing once per expectation. Each frame is
+    # [index, start, end, matches, last_end]. The generator returns the
+    # position where the first expectation stopped scanning.
+    count = len(expectations)
+    stack = [[0, segment.start, segment.end, matches, 0]]
+    scan_to = None
+    while stack:
+        frame = stack[-1]
+        index, start, end, matches, last_end = frame
+        if index == count:
+            yield matches
+            stack.pop()
+            scan_to = start
+            continue
+
+        expectation = expectations[index]
+        if scan_to is not None:
+            # The frame above has just finished
+            scan_to = max(scan_to, last_end)
+            if not expectation.is_looping:
+                stack.pop()
+                continue
+            start = scan_to
+            scan_to = None
+
+        child = None
+        while start < end:
+            res = expectation.scan(str, Segment(start, end))
+            if res.invalid():
+                if expectation.is_looping:
+                    start = max(res.end, start + 1)
+                    continue
+                scan_to = res.end
+                break
+
+            new_matches = save_match(str, res, expectation, matches)
+            if expectation.is_nested:
+                child = [index + 1, res.start, res.end, new_matches, 0]
             else:
-                return res.end
+                child = [index + 1, res.end, end, new_matches, 0]
+            break
+
+        if child is not None:
+            frame[1] = start
+            frame[4] = res.end
+            stack.append(child)
         else:
-            new_matches = current_matches
-            if res.start <= res.end and is_save:
-                new_matches = current_matches[:]
-                if len(expectation.transform_expectations) > 0:
-                    new_str = str[res.start : res.end]
-                    transform_results = []
-                    #print(new_str)
-                    #print(expectation.transform_expectations)
-                    scan_text_recursive(new_str, Segment(0, len(new_str)), expectation.transform_expectations, transform_results, [])
-                    new_matches.append(transform_results)
-                else:
-                    new_matches.append(str[res.start : res.end])
-
-            if is_nested:
-                scan_to = scan_text_recursive(str, Segment(res.start, res.end), expectations[1:], results, new_matches)
-            else:
-                scan_to = scan_text_recursive(str, Segment(res.end, end), expectations[1:], results, new_matches)
+            stack.pop()
+            if scan_to is None:
+                scan_to = start
 
-            if is_looping:
-                start = max(scan_to, res.end)
-            else:
-                return max(scan_to, res.end)
+    return scan_to
 
-    return start
+def scan_text_iter(str, expectations):
+    # Lazy version of scan_text. The document's bracket indexes live until
+    # the generator is exhausted or closed.
+    scan = begin_document_scan(str)
+    try:
+        yield from scan_expectations(str, Segment(0, len(str)), expectations, ())
+    finally:
+        end_document_scan(scan)
 
 def scan_text(str, expectations):
-    results = []
-    scan_text_recursive(str, Segment(0, len(str)), expectations, results, [])
-    return results
+    return list(scan_text_iter(str, expectations))
+
+_BRACES = re.compile("[{}]")
+
+def split_top_level_blocks(str):
+    # Cuts str right after every } closing a top-level { block. Joining the
+    # blocks gives back str. Whatever follows the last top-level block is a
+    # block of its own.
+    blocks = []
+    depth = 0
+    start = 0
+    for match in _BRACES.finditer(str):
+        if str[match.start()] == "{":
+            depth = depth + 1
+        elif depth > 0:
+            depth = depth - 1
+            if depth == 0:
+                blocks.append(str[start : match.end()])
+                start = match.end()
+    if start < len(str):
+        blocks.append(str[start:])
+    return blocks